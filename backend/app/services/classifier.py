@@ -1,8 +1,8 @@
 from typing import Tuple
-import pytesseract
 from PIL import Image
 import os
 from ..utils.ai import get_gpt_classification
+from ..utils.ocr import image_to_string
 
 class DocumentClassifier:
     SUPPORTED_TYPES = ["passport", "drivers_license", "ead_card"]
@@ -16,7 +16,7 @@ class DocumentClassifier:
         # Extract text using OCR
         try:
             image = Image.open(image_path)
-            text = pytesseract.image_to_string(image)
+            text = image_to_string(image)
         except Exception as e:
             raise Exception(f"OCR failed: {str(e)}")
 
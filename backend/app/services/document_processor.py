@@ -9,10 +9,18 @@ from ..utils.pdf_processor import convert_pdf_bytes_to_image
 from ..utils.ai import get_gpt_classification, get_gpt_extraction, check_image_quality
 from ..utils.field_mapping import standardize_field_names, validate_required_fields, get_essential_fields, REQUIRED_FIELDS
 from ..preprocess_image import preprocess_image
-from datetime import datetime
+from datetime import date
 
 logger = logging.getLogger(__name__)
 
+# Passport-style dates such as 15JAN1985, compiled once rather than looked up on every call
+_PASSPORT_DATE_RE = re.compile(r'^(\d{2})([A-Z]{3})(\d{4})$')
+_MONTH_NUMBERS = {
+    abbr: number for number, abbr in enumerate(
+        ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'), start=1
+    )
+}
+
 class DocumentProcessor:
     def __init__(self):
         self._setup_templates()
@@ -67,15 +75,17 @@ class DocumentProcessor:
     @staticmethod
     def normalize_date(date_str):
         # Try to match formats like 15JAN1985, 01FEB2020, etc.
-        match = re.match(r'^(\d{2})([A-Z]{3})(\d{4})$', date_str)
+        match = _PASSPORT_DATE_RE.match(date_str)
         if match:
             day, month_abbr, year = match.groups()
-            try:
-                # Convert month abbreviation to title case for strptime
-                date_obj = datetime.strptime(f'{day} {month_abbr.title()} {year}', '%d %b %Y')
-                return date_obj.strftime('%d %b %Y')
-            except Exception:
-                pass
+            month = _MONTH_NUMBERS.get(month_abbr)
+            if month:
+                try:
+                    # Building the date validates the day for that month and year
+                    date(int(year), month, int(day))
+                    return f'{day} {month_abbr.title()} {int(year)}'
+                except ValueError:
+                    pass
         # If already in a good format or can't parse, return as is
         return date_str
 
@@ -1,16 +1,26 @@
 import os
 import re
-from typing import Tuple, Dict, List, Optional
+from typing import Tuple, Dict, List, Optional, Union, BinaryIO
 from openai import OpenAI
 from dotenv import load_dotenv
 import json
 import logging
 import base64
-from PIL import Image
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageOps
 from io import BytesIO
 import httpx
 import openai  # Expose openai for test patching
 
+# Prefer orjson for parsing GPT responses when it's installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 load_dotenv()
 
 # Configure OpenAI with optional proxy
@@ -31,46 +41,228 @@ logger = logging.getLogger(__name__)
 
 openai = openai
 
-def check_image_quality(image_path: str) -> Tuple[bool, Optional[str]]:
+# LRU cache of GPT extraction results, keyed by image content and prompt inputs.
+# Responses are deterministic at temperature=0, so re-uploads can skip the API call.
+EXTRACTION_CACHE_SIZE = 1024
+_extraction_cache: "OrderedDict[bytes, Dict[str, str]]" = OrderedDict()
+_extraction_cache_lock = threading.Lock()
+
+def _extraction_cache_key(image_bytes: bytes, doc_type: str, fields: List[str]) -> bytes:
+    """Hash the image bytes salted with the doc type and field list"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{doc_type}|{','.join(sorted(fields))}".encode('utf-8'))
+    digest.update(image_bytes)
+    return digest.digest()
+
+def _get_cached_extraction(key: bytes) -> Optional[Dict[str, str]]:
+    """Return a copy of the cached extraction for key, or None on a miss"""
+    with _extraction_cache_lock:
+        cached = _extraction_cache.get(key)
+        if cached is None:
+            return None
+        _extraction_cache.move_to_end(key)
+        return dict(cached)
+
+def _cache_extraction(key: bytes, extracted_fields: Dict[str, str]) -> None:
+    """Store an extraction result, evicting the least recently used entry when full"""
+    with _extraction_cache_lock:
+        _extraction_cache[key] = dict(extracted_fields)
+        _extraction_cache.move_to_end(key)
+        if len(_extraction_cache) > EXTRACTION_CACHE_SIZE:
+            _extraction_cache.popitem(last=False)
+
+# Images sent to GPT-4 Vision are downscaled to fit this box and re-encoded as JPEG
+# unless they are already a JPEG under the size threshold
+VISION_MAX_DIMENSION = 2048
+VISION_REENCODE_THRESHOLD = 1024 * 1024  # 1MB
+
+# Largest image file accepted for quality checking and extraction
+MAX_IMAGE_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Document-type specific extraction prompts, filled in with the comma-separated field list
+_PROMPT_TEMPLATES: Dict[str, str] = {
+    'passport': (
+        "Extract the following fields from this passport document and return them as a JSON object with exactly these keys: {fields_str}. "
+        "Focus on these critical passport fields: full_name, date_of_birth, country, issue_date, expiration_date, nationality, document_number. "
+        "For document_number, look for 'Passport Number' or similar. "
+        "For country and nationality, look for 'Nationality' or country of issuance. "
+        'If a field is missing or unreadable, use "NOT_FOUND". Return only a JSON object without explanation.'
+    ),
+    'drivers_license': (
+        "Extract the following fields from this driver's license document and return them as a JSON object with exactly these keys: {fields_str}. "
+        "Focus ONLY on these critical driver's license fields: license_number, date_of_birth, issue_date, expiration_date, first_name, last_name. "
+        "For license_number, look for 'Driver License Number', 'DL Number', or similar. "
+        "The license_number field is the most important field to extract correctly. "
+        'If a field is missing or unreadable, use "NOT_FOUND". Return only a JSON object without explanation.'
+    ),
+    'ead_card': (
+        "Extract the following fields from this Employment Authorization Document (EAD) and return them as a JSON object with exactly these keys: {fields_str}. "
+        "Focus on these critical EAD fields: card_number, category, card_expires_date, last_name, first_name. "
+        "For card_number, look for 'Card#', 'EAD Number', or similar. "
+        "For card_expires_date, look for 'Expires' or 'Valid Until'. "
+        'If a field is missing or unreadable, use "NOT_FOUND". Return only a JSON object without explanation.'
+    ),
+    # Generic prompt for unknown document types
+    '_default': (
+        "Extract the following fields from this document image and return them as a JSON object with exactly these keys: {fields_str}. "
+        "For the field 'document_number', extract the value labeled as 'Number', 'Document Number', 'ID Number', or similar. "
+        'If a field is missing or unreadable, use "NOT_FOUND". Return only a JSON object without explanation.'
+    ),
+}
+
+# Lowercased doc_type spellings that select a specific prompt template
+_DOC_TYPE_CANON: Dict[str, str] = {
+    'passport': 'passport',
+    'drivers_license': 'drivers_license',
+    'driver license': 'drivers_license',
+    'dl': 'drivers_license',
+    'ead': 'ead_card',
+    'employment authorization': 'ead_card',
+}
+
+def _check_image_content(img: Image.Image) -> Tuple[bool, Optional[str]]:
+    """Check resolution and blankness of an opened image. Returns (is_valid, error_message)"""
+    # Check image resolution
+    width, height = img.size
+    if width < 500 or height < 300:
+        return False, f"Image resolution too low ({width}x{height}). Minimum required is 500x300 for accurate processing."
+        
+    # Check if image is empty or solid color
+    if img.mode == 'RGB':
+        # Convert to grayscale for histogram analysis
+        img = img.convert('L')
+    
+    # Get image histogram
+    hist = img.histogram()
+    
+    # Check if image is mostly empty (>90% white or black)
+    total_pixels = width * height
+    white_threshold = int(total_pixels * 0.9)
+    black_threshold = int(total_pixels * 0.9)
+    
+    if hist[0] > black_threshold or hist[255] > white_threshold:
+        return False, "Image appears to be blank or too dark. Please provide a clearer scan."
+    
+    return True, None
+
+def check_image_quality(image_path: Union[str, BinaryIO, Image.Image], file_size: Optional[int] = None) -> Tuple[bool, Optional[str]]:
     """
     Check basic image quality before sending to GPT-4 Vision.
+    image_path may also be a seekable binary file object or an already-loaded PIL Image;
+    for a PIL Image the file size check only runs if file_size is given.
+    Pass file_size if the caller has already stat'ed the file.
     Returns (is_valid, error_message)
     """
     try:
-        with Image.open(image_path) as img:
-            # Check image resolution
-            width, height = img.size
-            if width < 500 or height < 300:
-                return False, f"Image resolution too low ({width}x{height}). Minimum required is 500x300 for accurate processing."
-                
-            # Check if image is empty or solid color
-            if img.mode == 'RGB':
-                # Convert to grayscale for histogram analysis
-                img = img.convert('L')
-            
-            # Get image histogram
-            hist = img.histogram()
-            
-            # Check if image is mostly empty (>90% white or black)
-            total_pixels = width * height
-            white_threshold = int(total_pixels * 0.9)
-            black_threshold = int(total_pixels * 0.9)
-            
-            if hist[0] > black_threshold or hist[255] > white_threshold:
-                return False, "Image appears to be blank or too dark. Please provide a clearer scan."
-            
-            # Check file size
-            img.seek(0)
-            file_size = os.path.getsize(image_path)
-            if file_size > 10 * 1024 * 1024:  # 10MB
-                return False, "File size too large. Please compress the image."
-            
-            return True, None
+        if isinstance(image_path, Image.Image):
+            is_valid, error_msg = _check_image_content(image_path)
+        else:
+            with Image.open(image_path) as img:
+                is_valid, error_msg = _check_image_content(img)
+            if is_valid and file_size is None:
+                if hasattr(image_path, 'seek'):
+                    file_size = image_path.seek(0, os.SEEK_END)
+                else:
+                    file_size = os.path.getsize(image_path)
+        if not is_valid:
+            return is_valid, error_msg
+        
+        # Check file size
+        if file_size is not None and file_size > MAX_IMAGE_FILE_SIZE:
+            return False, "File size too large. Please compress the image."
+        
+        return True, None
             
     except Exception as e:
         logger.error(f"Error checking image quality: {e}")
         return False, f"Invalid image file: {str(e)}"
 
+class _JsonObjectScanner:
+    """
+    Incrementally tracks brace depth to find where the first top-level JSON object ends.
+    Braces inside quoted strings are ignored. Text can be fed in one piece or chunk by chunk.
+    """
+    def __init__(self):
+        self.start = -1  # Offset of the opening brace, -1 until one is seen
+        self.end = -1    # Offset of the matching closing brace, -1 until the object closes
+        self._offset = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> bool:
+        """Scan the next piece of text. Returns True once the first object has closed."""
+        if self.end != -1:
+            return True
+        
+        pos = 0
+        if self.start == -1:
+            pos = text.find('{')
+            if pos == -1:
+                self._offset += len(text)
+                return False
+            self.start = self._offset + pos
+        
+        for i in range(pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = self._offset + i
+                    return True
+        
+        self._offset += len(text)
+        return False
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced {...} object in text, or None if there isn't one.
+    Walks the string once tracking brace depth, ignoring braces inside quoted strings.
+    """
+    scanner = _JsonObjectScanner()
+    if scanner.feed(text):
+        return text[scanner.start:scanner.end + 1]
+    if scanner.start == -1:
+        return None
+    
+    # Unbalanced object - hand back everything up to the last closing brace
+    end = text.rfind('}')
+    return text[scanner.start:end + 1] if end > scanner.start else None
+
+def _read_streamed_response(stream) -> str:
+    """
+    Accumulate text from a streamed chat completion, closing the stream as soon as
+    the first JSON object is complete so trailing tokens aren't waited on.
+    """
+    scanner = _JsonObjectScanner()
+    parts = []
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            if scanner.feed(delta):
+                break
+    finally:
+        close = getattr(stream, 'close', None)
+        if close is not None:
+            close()
+    return ''.join(parts)
+
 def validate_gpt_response(response_text: str, doc_type: str, fields: List[str]) -> Tuple[bool, Optional[str], Optional[Dict]]:
     """
     Parse GPT's response and extract JSON.
@@ -82,44 +274,49 @@ def validate_gpt_response(response_text: str, doc_type: str, fields: List[str])
         
         # First try direct JSON parsing
         try:
-            extracted_fields = json.loads(response_text)
+            extracted_fields = _json_loads(response_text)
             logger.debug("Direct JSON parsing successful")
-        except json.JSONDecodeError:
+        except ValueError:
             # If direct parsing fails, try to find JSON object in the response
             logger.debug("Direct JSON parsing failed, trying to extract JSON from response")
-            json_match = re.search(r'\{[\s\S]*\}', response_text)
-            if not json_match:
+            json_str = _extract_json_object(response_text)
+            if json_str is None:
                 logger.error("No JSON object found in response")
                 return False, "No valid JSON found in GPT response", None
             
-            # Clean up the JSON string
-            json_str = json_match.group(0)
-            json_str = re.sub(r'[\n\r\t]', '', json_str)  # Remove newlines and tabs
-            json_str = re.sub(r',\s*}', '}', json_str)    # Remove trailing commas
-            
             try:
-                extracted_fields = json.loads(json_str)
+                extracted_fields = _json_loads(json_str)
                 logger.debug("JSON extraction and parsing successful")
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse extracted JSON: {str(e)}\nJSON string: {json_str}")
-                return False, f"Invalid JSON format: {str(e)}", None
+            except ValueError:
+                # Clean up the JSON string only if the raw slice doesn't parse
+                json_str = re.sub(r'[\n\r\t]', '', json_str)  # Remove newlines and tabs
+                json_str = re.sub(r',\s*}', '}', json_str)    # Remove trailing commas
+                try:
+                    extracted_fields = _json_loads(json_str)
+                    logger.debug("JSON extraction and parsing successful after cleanup")
+                except ValueError as e:
+                    logger.error(f"Failed to parse extracted JSON: {str(e)}\nJSON string: {json_str}")
+                    return False, f"Invalid JSON format: {str(e)}", None
         
         # Log extracted fields
         logger.debug(f"Extracted fields: {extracted_fields}")
         
         # Validate required fields
-        missing_fields = [field for field in fields if field not in extracted_fields]
+        missing_fields = frozenset(fields).difference(extracted_fields)
         if missing_fields:
-            logger.warning(f"Missing fields in response: {missing_fields}")
-            extracted_fields.update({field: "NOT_FOUND" for field in missing_fields})
+            # Add placeholders in the requested field order
+            missing_in_order = [field for field in fields if field in missing_fields]
+            logger.warning(f"Missing fields in response: {missing_in_order}")
+            extracted_fields.update({field: "NOT_FOUND" for field in missing_in_order})
             
         # Validate field formats
         invalid_fields = []
         for field, value in extracted_fields.items():
-            if not value or value.strip() == "":
+            if not value or value.isspace():
                 extracted_fields[field] = "NOT_FOUND"
                 invalid_fields.append(field)
-            elif isinstance(value, str):
+            elif isinstance(value, str) and not (value.isupper() and value == value.strip()):
+                # GPT usually returns uppercase already; only rebuild values that aren't canonical
                 extracted_fields[field] = value.strip().upper()
                 
         if invalid_fields:
@@ -200,35 +397,59 @@ def validate_field_format(field_name: str, value: str) -> bool:
         
     return bool(re.match(patterns[field_name], value))
 
+def _prepare_vision_image(image_bytes: bytes) -> str:
+    """
+    Downscale and re-encode an image for GPT-4 Vision if needed, returning it as base64.
+    GPT-4o downsamples anything larger than VISION_MAX_DIMENSION for detail=high, so only
+    re-encode when the image is oversized, too heavy, or not already a JPEG.
+    """
+    with Image.open(BytesIO(image_bytes)) as img:
+        if (max(img.size) > VISION_MAX_DIMENSION
+                or len(image_bytes) > VISION_REENCODE_THRESHOLD
+                or img.format != 'JPEG'):
+            # Re-encoding drops EXIF, so apply the Orientation tag to the pixels first
+            img = ImageOps.exif_transpose(img)
+            # Convert to RGB if necessary
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            img.thumbnail((VISION_MAX_DIMENSION, VISION_MAX_DIMENSION), Image.LANCZOS)
+            jpeg_buffer = BytesIO()
+            img.save(jpeg_buffer, 'JPEG', quality=85)
+            image_bytes = jpeg_buffer.getvalue()
+    return base64.b64encode(image_bytes).decode('utf-8')
+
 def get_gpt_extraction(image_path: str, doc_type: str, fields: List[str]) -> Dict[str, str]:
     """Extract fields from image using GPT-4 Vision"""
     try:
-        # First check image quality
-        is_valid, error_msg = check_image_quality(image_path)
-        if not is_valid:
-            logger.error(f"Image quality check failed: {error_msg}")
+        # Validate image file exists, stat'ing it once for the size checks below
+        try:
+            file_size = os.stat(image_path).st_size
+        except FileNotFoundError:
+            logger.error(f"Image file not found: {image_path}")
             return {field: "NOT_FOUND" for field in fields}
 
-        # Validate image file exists and is readable
-        if not os.path.exists(image_path):
-            logger.error(f"Image file not found: {image_path}")
+        # Reject oversized files before reading them into memory
+        if file_size > MAX_IMAGE_FILE_SIZE:
+            logger.error("Image file too large for GPT Vision API")
+            return {field: "NOT_FOUND" for field in fields}
+
+        # Return the cached result if this image was already extracted with the same prompt inputs
+        with open(image_path, 'rb') as image_file:
+            image_bytes = image_file.read()
+        cache_key = _extraction_cache_key(image_bytes, doc_type, fields)
+        cached_fields = _get_cached_extraction(cache_key)
+        if cached_fields is not None:
+            logger.debug(f"Using cached GPT extraction for {image_path}")
+            return cached_fields
+
+        # Check image quality on the bytes already read rather than reopening the file
+        is_valid, error_msg = check_image_quality(BytesIO(image_bytes), file_size)
+        if not is_valid:
+            logger.error(f"Image quality check failed: {error_msg}")
             return {field: "NOT_FOUND" for field in fields}
 
         try:
-            # Try to open and validate the image
-            with Image.open(image_path) as img:
-                # Check if image is too large
-                if os.path.getsize(image_path) > 20 * 1024 * 1024:  # 20MB limit
-                    logger.error("Image file too large for GPT Vision API")
-                    return {field: "NOT_FOUND" for field in fields}
-                # Convert to RGB if necessary
-                if img.mode not in ('RGB', 'L'):
-                    img = img.convert('RGB')
-                # Save as JPEG if not already
-                if not image_path.lower().endswith('.jpg'):
-                    temp_path = image_path + '.jpg'
-                    img.save(temp_path, 'JPEG', quality=95)  # Increased JPEG quality
-                    image_path = temp_path
+            image_base64 = _prepare_vision_image(image_bytes)
         except Exception as img_error:
             logger.error(f"Error processing image: {str(img_error)}")
             return {field: "NOT_FOUND" for field in fields}
@@ -236,52 +457,15 @@ def get_gpt_extraction(image_path: str, doc_type: str, fields: List[str]) -> Dic
         # Fields string for the prompt
         fields_str = ', '.join(fields)
         
-        # Create document-type specific prompts
-        if doc_type.lower() == 'passport':
-            prompt = (
-                f"Extract the following fields from this passport document and return them as a JSON object with exactly these keys: {fields_str}. "
-                "Focus on these critical passport fields: full_name, date_of_birth, country, issue_date, expiration_date, nationality, document_number. "
-                "For document_number, look for 'Passport Number' or similar. "
-                "For country and nationality, look for 'Nationality' or country of issuance. "
-                'If a field is missing or unreadable, use "NOT_FOUND". Return only a JSON object without explanation.'
-            )
-        elif doc_type.lower() in ['drivers_license', 'driver license', 'dl']:
-            prompt = (
-                f"Extract the following fields from this driver's license document and return them as a JSON object with exactly these keys: {fields_str}. "
-                "Focus ONLY on these critical driver's license fields: license_number, date_of_birth, issue_date, expiration_date, first_name, last_name. "
-                "For license_number, look for 'Driver License Number', 'DL Number', or similar. "
-                "The license_number field is the most important field to extract correctly. "
-                'If a field is missing or unreadable, use "NOT_FOUND". Return only a JSON object without explanation.'
-            )
-        elif doc_type.lower() in ['ead', 'employment authorization']:
-            prompt = (
-                f"Extract the following fields from this Employment Authorization Document (EAD) and return them as a JSON object with exactly these keys: {fields_str}. "
-                "Focus on these critical EAD fields: card_number, category, card_expires_date, last_name, first_name. "
-                "For card_number, look for 'Card#', 'EAD Number', or similar. "
-                "For card_expires_date, look for 'Expires' or 'Valid Until'. "
-                'If a field is missing or unreadable, use "NOT_FOUND". Return only a JSON object without explanation.'
-            )
-        else:
-            # Generic prompt for unknown document types
-            prompt = (
-                f"Extract the following fields from this document image and return them as a JSON object with exactly these keys: {fields_str}. "
-                "For the field 'document_number', extract the value labeled as 'Number', 'Document Number', 'ID Number', or similar. "
-                'If a field is missing or unreadable, use "NOT_FOUND". Return only a JSON object without explanation.'
-            )
+        # Create document-type specific prompt
+        canonical_type = _DOC_TYPE_CANON.get(doc_type.lower(), '_default')
+        prompt = _PROMPT_TEMPLATES[canonical_type].format(fields_str=fields_str)
         
         # --- LOGGING ---
         logger.info(f"Sending image to GPT-4 Vision: {image_path}")
         logger.info(f"Prompt sent to GPT-4 Vision:\n{prompt}")
         # --- END LOGGING ---
 
-        try:
-            # Convert image to base64
-            with open(image_path, "rb") as image_file:
-                image_base64 = base64.b64encode(image_file.read()).decode('utf-8')
-        except Exception as b64_error:
-            logger.error(f"Error converting image to base64: {str(b64_error)}")
-            return {field: "NOT_FOUND" for field in fields}
-
         try:
             # Make API call to GPT-4 Vision
             response = client.chat.completions.create(
@@ -309,14 +493,14 @@ def get_gpt_extraction(image_path: str, doc_type: str, fields: List[str]) -> Dic
                     }
                 ],
                 max_tokens=1000,
-                temperature=0
+                temperature=0,
+                stream=True
             )
+            # Get response text, stopping once the JSON object has been received
+            response_text = _read_streamed_response(response)
         except Exception as api_error:
             logger.error(f"Error calling GPT Vision API: {str(api_error)}")
             return {field: "NOT_FOUND" for field in fields}
-
-        # Get response text
-        response_text = response.choices[0].message.content
         
         # Log the raw response
         logger.debug(f"Raw GPT response for {doc_type}: {response_text}")
@@ -346,6 +530,7 @@ def get_gpt_extraction(image_path: str, doc_type: str, fields: List[str]) -> Dic
         else:
             extracted_fields["document_number"] = "NOT_FOUND"
         
+        _cache_extraction(cache_key, extracted_fields)
         return extracted_fields
 
     except Exception as e:
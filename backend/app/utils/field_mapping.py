@@ -10,15 +10,15 @@ logger = logging.getLogger(__name__)
 
 # Define required fields for each document type
 REQUIRED_FIELDS = {
-    'passport': {
+    'passport': frozenset({
         'full_name', 'date_of_birth', 'country', 'issue_date', 'expiration_date'
-    },
-    'drivers_license': {
+    }),
+    'drivers_license': frozenset({
         'license_number', 'date_of_birth', 'issue_date', 'expiration_date', 'first_name', 'last_name'
-    },
-    'ead_card': {
+    }),
+    'ead_card': frozenset({
         'card_number', 'category', 'first_name', 'last_name', 'card_expires_date'
-    }
+    })
 }
 
 # Field name standardization mappings
@@ -75,6 +75,37 @@ FIELD_ALIASES = {
     'class': 'category'
 }
 
+# Accepted spellings for each document type, keyed by lowercase name
+DOC_TYPE_ALIASES = {
+    'driver': 'drivers_license',
+    'drivers_license': 'drivers_license',
+    'driver_license': 'drivers_license',
+    'dl': 'drivers_license',
+    'driver license': 'drivers_license',
+    'passport': 'passport',
+    'pasport': 'passport',
+    'p': 'passport',
+    'ead': 'ead_card',
+    'employment_authorization': 'ead_card',
+    'ead_card': 'ead_card'
+}
+
+# Display value for the document_type field of each document type
+DOC_TYPE_DISPLAY_NAMES = {
+    'passport': 'Passport',
+    'drivers_license': 'Driver\'s License',
+    'ead_card': 'EAD Card'
+}
+
+# Alias maps specialized per document type, built once at import so that
+# standardizing a field is a single dict lookup. For EAD cards 'expiration_date'
+# maps to 'card_expires_date'; everywhere else it stays as is.
+_DOC_TYPE_FIELD_ALIASES = {
+    'passport': FIELD_ALIASES,
+    'drivers_license': FIELD_ALIASES,
+    'ead_card': {**FIELD_ALIASES, 'expiration_date': 'card_expires_date'}
+}
+
 def standardize_field_names(extracted_fields: Dict[str, str], doc_type: str) -> Dict[str, str]:
     """
     Standardize field names based on aliases and document type.
@@ -87,36 +118,23 @@ def standardize_field_names(extracted_fields: Dict[str, str], doc_type: str) ->
     standardized = {}
     
     # Convert doc_type to standard format - be more permissive with matching
-    if doc_type.lower() in ['driver', 'drivers_license', 'driver_license', 'dl', 'driver license']:
-        doc_type = 'drivers_license'
-    elif doc_type.lower() in ['passport', 'pasport', 'p']:
-        doc_type = 'passport'
-    elif doc_type.lower() in ['ead', 'employment_authorization', 'ead_card']:
-        doc_type = 'ead_card'
+    doc_type = DOC_TYPE_ALIASES.get(doc_type.lower(), doc_type)
+    is_passport = doc_type == 'passport'
     
     # Ensure document_type field is standardized
     # Always convert 'P' to 'Passport' regardless of where it appears
-    if 'document_type' in extracted_fields:
-        if extracted_fields['document_type'] == 'P':
-            standardized['document_type'] = 'Passport'
-        elif doc_type == 'passport':
-            standardized['document_type'] = 'Passport'
-        elif doc_type == 'drivers_license':
-            standardized['document_type'] = 'Driver\'s License'
-        elif doc_type == 'ead_card':
-            standardized['document_type'] = 'EAD Card'
-        else:
-            standardized['document_type'] = extracted_fields['document_type']
+    display_name = DOC_TYPE_DISPLAY_NAMES.get(doc_type)
+    if extracted_fields.get('document_type') == 'P':
+        standardized['document_type'] = 'Passport'
+    elif display_name:
+        standardized['document_type'] = display_name
+    elif 'document_type' in extracted_fields:
+        standardized['document_type'] = extracted_fields['document_type']
     else:
-        # If document_type is not in the fields, set it based on doc_type
-        if doc_type == 'passport':
-            standardized['document_type'] = 'Passport'
-        elif doc_type == 'drivers_license':
-            standardized['document_type'] = 'Driver\'s License'
-        elif doc_type == 'ead_card':
-            standardized['document_type'] = 'EAD Card'
-        else:
-            standardized['document_type'] = doc_type
+        # If document_type is not in the fields, fall back to doc_type
+        standardized['document_type'] = doc_type
+    
+    aliases = _DOC_TYPE_FIELD_ALIASES.get(doc_type, FIELD_ALIASES)
     
     # Process all extracted fields
     for field_name, value in extracted_fields.items():
@@ -124,24 +142,13 @@ def standardize_field_names(extracted_fields: Dict[str, str], doc_type: str) ->
         if field_name == 'document_type':
             continue
             
-        # Convert field name to lowercase
+        # Check if field is in aliases, otherwise keep original (lowercased)
         field_name_lower = field_name.lower()
+        std_field_name = aliases.get(field_name_lower, field_name_lower)
         
-        # Special handling for expiration_date based on document type
-        if field_name_lower == 'expiration_date':
-            if doc_type == 'ead_card':
-                std_field_name = 'card_expires_date'
-            else:
-                std_field_name = 'expiration_date'
         # For passports, make sure both country and nationality are preserved
-        elif field_name_lower == 'country' and doc_type == 'passport':
-            std_field_name = 'country'
-            # If nationality is not set, also use this value for nationality
-            if 'nationality' not in standardized:
-                standardized['nationality'] = value
-        else:
-            # Check if field is in aliases, otherwise keep original
-            std_field_name = FIELD_ALIASES.get(field_name_lower, field_name_lower)
+        if is_passport and std_field_name == 'country' and 'nationality' not in standardized:
+            standardized['nationality'] = value
         
         standardized[std_field_name] = value
         
@@ -155,7 +162,7 @@ def standardize_field_names(extracted_fields: Dict[str, str], doc_type: str) ->
                     standardized['last_name'] = parts[1]
     
     # Special case for passport documents: Always include issue_date even if not found
-    if doc_type == 'passport' and ('issue_date' not in standardized or standardized['issue_date'] == 'NOT_FOUND'):
+    if is_passport and ('issue_date' not in standardized or standardized['issue_date'] == 'NOT_FOUND'):
         # If date_of_issue is available but issue_date is not, use date_of_issue
         if 'date_of_issue' in standardized and standardized['date_of_issue'] != 'NOT_FOUND':
             standardized['issue_date'] = standardized['date_of_issue']
@@ -178,33 +185,24 @@ def validate_required_fields(fields: Dict[str, str], doc_type: str) -> Tuple[boo
         Tuple: (is_valid, missing_fields)
     """
     # Standardize doc_type
-    if doc_type.lower() in ['driver', 'drivers_license', 'driver_license', 'dl', 'driver license']:
-        doc_type = 'drivers_license'
-    elif doc_type.lower() in ['passport', 'pasport', 'p']:
-        doc_type = 'passport'
-    elif doc_type.lower() in ['ead', 'employment_authorization', 'ead_card']:
-        doc_type = 'ead_card'
-    else:
+    doc_type = DOC_TYPE_ALIASES.get(doc_type.lower())
+    if doc_type is None:
         # Unknown document type - can't validate required fields
         return False, ["Unknown document type - cannot validate required fields"]
     
     # Get required fields for document type
-    required = REQUIRED_FIELDS.get(doc_type, set())
+    required = REQUIRED_FIELDS.get(doc_type, frozenset())
     
     # Log the required fields for debugging
     logger.debug(f"Required fields for {doc_type}: {required}")
     logger.debug(f"Provided fields: {fields}")
     
-    # Check for missing fields
-    missing = []
-    for field in required:
-        # For passports, we're more lenient with issue_date - if it's 'Unknown', that's ok
-        if field == 'issue_date' and doc_type == 'passport' and fields.get(field) == 'Unknown':
-            continue
-            
-        if field not in fields or fields[field] == "NOT_FOUND":
-            missing.append(field)
-            logger.error(f"Missing required field: {field}")
+    # Check for missing fields. For passports an issue_date of 'Unknown' is accepted,
+    # which falls out naturally since only NOT_FOUND values count as missing.
+    present = {field for field, value in fields.items() if value != "NOT_FOUND"}
+    missing = list(required - present)
+    for field in missing:
+        logger.error(f"Missing required field: {field}")
     
     if missing:
         logger.error(f"Critical fields missing: {missing}")
@@ -220,11 +218,6 @@ def get_essential_fields(doc_type: str) -> List[str]:
         List of essential field names
     """
     # Standardize doc_type
-    if doc_type.lower() in ['driver', 'drivers_license', 'driver_license', 'dl']:
-        doc_type = 'drivers_license'
-    elif doc_type.lower() in ['passport', 'pasport', 'p']:
-        doc_type = 'passport'
-    elif doc_type.lower() in ['ead', 'employment_authorization', 'ead_card']:
-        doc_type = 'ead_card'
+    doc_type = DOC_TYPE_ALIASES.get(doc_type.lower(), doc_type)
     
     return list(REQUIRED_FIELDS.get(doc_type, [])) 
\ No newline at end of file
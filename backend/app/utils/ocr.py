@@ -7,13 +7,189 @@ import tempfile
 from io import BytesIO
 import logging
 import re
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 
+try:
+    # In-process libtesseract bindings: the model loads once instead of per subprocess
+    from tesserocr import PyTessBaseAPI, OEM, PSM
+except ImportError:
+    PyTessBaseAPI = None
+
 logger = logging.getLogger(__name__)
 
-def extract_text_from_image(image_path: str) -> str:
-    """Extract text from image using OCR with improved accuracy"""
+# Page segmentation modes tried for each preprocessed image
+OCR_PAGE_SEG_MODES = [
+    6,   # Default: assume a single uniform block of text
+    3,   # Full page
+    11,  # Sparse text
+    4,   # Assume single column of text
+]
+
+# Sizing of images handed to tesseract
+MAX_OCR_WIDTH = 1600
+TARGET_TEXT_HEIGHT = 30     # Glyph height in pixels that tesseract reads well
+RESCALE_TOLERANCE = 0.1     # Skip resizing when the scale is within 10% of 1
+MIN_GLYPH_HEIGHT = 4        # Smaller components are treated as noise
+MIN_GLYPH_COUNT = 20        # Need this many glyph-like components to trust the estimate
+
+# Thresholds for picking a single preprocessing on the fast OCR path
+LOW_CONTRAST_STD = 40        # Grayscale std below this gets CLAHE
+BLURRY_LAPLACIAN_VAR = 100   # Laplacian variance below this gets adaptive thresholding
+FAST_PATH_MIN_CONFIDENCE = 60  # Below this, fall back to trying every variant and mode
+GOOD_ENOUGH_CONFIDENCE = 85    # Stop searching variants and modes once a result reaches this
+
+# One tesserocr API per thread; PyTessBaseAPI is not safe to share across threads
+_tess_local = threading.local()
+
+# Long-lived OCR worker threads shared across requests, so per-thread OCR state
+# (such as the cached tesserocr API) survives between calls
+OCR_WORKERS = os.cpu_count() or 1
+_ocr_executor = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+
+def _get_tess_api():
+    """Return this thread's cached PyTessBaseAPI, creating it on first use"""
+    api = getattr(_tess_local, 'api', None)
+    if api is None:
+        api = PyTessBaseAPI(lang='eng', oem=OEM.DEFAULT)
+        _tess_local.api = api
+    return api
+
+def image_to_string(image: Image.Image) -> str:
+    """OCR a PIL image with automatic page segmentation, in-process when tesserocr is installed"""
+    if PyTessBaseAPI is not None:
+        api = _get_tess_api()
+        api.SetPageSegMode(PSM.AUTO)
+        api.SetImage(image)
+        return api.GetUTF8Text()
+    return pytesseract.image_to_string(image)
+
+def _ocr_with_psm(img: Union[np.ndarray, Image.Image], psm: int) -> Tuple[str, float]:
+    """
+    Run OCR on an image with the given page segmentation mode, returning (text, mean confidence).
+    Takes a contiguous grayscale array with tesserocr and a PIL image with pytesseract.
+    """
+    if PyTessBaseAPI is not None:
+        api = _get_tess_api()
+        api.SetPageSegMode(psm)
+        # Hand tesseract the raw 8-bit buffer; no PIL image or encode in between
+        height, width = img.shape
+        api.SetImageBytes(img.tobytes(), width, height, 1, width)
+        text = api.GetUTF8Text()
+        return text, api.MeanTextConf()
+
+    config = f'--oem 3 --psm {psm} -l eng'
+    # Get OCR data; the text is rebuilt from it rather than re-running recognition
+    data = pytesseract.image_to_data(
+        img, config=config,
+        output_type=pytesseract.Output.DICT
+    )
+    
+    # Calculate confidence
+    conf_values = [c for c in data['conf'] if c > 0]
+    avg_conf = sum(conf_values) / len(conf_values) if conf_values else 0
+    
+    return _text_from_ocr_data(data), avg_conf
+
+def _text_from_ocr_data(data: Dict[str, list]) -> str:
+    """Rebuild page text from pytesseract image_to_data output, one line per OCR line"""
+    lines = []
+    current_line = None
+    words = []
+    for block, par, line, word in zip(data['block_num'], data['par_num'], data['line_num'], data['text']):
+        if not word or not word.strip():
+            continue
+        line_key = (block, par, line)
+        if line_key != current_line:
+            if words:
+                lines.append(' '.join(words))
+            current_line = line_key
+            words = []
+        words.append(word)
+    if words:
+        lines.append(' '.join(words))
+    return '\n'.join(lines)
+
+def _estimate_text_height(gray: np.ndarray) -> Optional[float]:
+    """Estimate the typical glyph height in pixels from connected components, or None if unclear"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    max_height = gray.shape[0] / 4
+    heights = [
+        h for _, _, w, h in map(cv2.boundingRect, contours)
+        if MIN_GLYPH_HEIGHT <= h <= max_height and w <= 3 * h
+    ]
+    if len(heights) < MIN_GLYPH_COUNT:
+        return None
+    return float(np.median(heights))
+
+def _as_array(img) -> np.ndarray:
+    """Download a cv2.UMat to a numpy array; arrays are returned as-is"""
+    return img.get() if isinstance(img, cv2.UMat) else img
+
+def _adaptive_threshold(gray: np.ndarray) -> np.ndarray:
+    # Box mean rather than Gaussian weights: OpenCV computes it with running sums,
+    # roughly halving the cost of this pass
+    return cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+        cv2.THRESH_BINARY, 11, 2
+    )
+
+def _otsu_threshold(gray: np.ndarray) -> np.ndarray:
+    _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return otsu
+
+def _enhance_contrast(gray: np.ndarray) -> np.ndarray:
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+    return clahe.apply(gray)
+
+def _select_preprocessing(gray: np.ndarray) -> np.ndarray:
+    """Pick a single preprocessing for the image from cheap contrast and blur statistics"""
+    if gray.std() < LOW_CONTRAST_STD:
+        return _enhance_contrast(gray)
+    if cv2.Laplacian(gray, cv2.CV_64F).var() < BLURRY_LAPLACIAN_VAR:
+        return _adaptive_threshold(gray)
+    return _otsu_threshold(gray)
+
+def _best_ocr_result(images: List[np.ndarray], page_seg_modes: List[int]) -> Tuple[str, float]:
+    """OCR every image with every mode and return the (text, confidence) with the highest confidence"""
+    best_text = ""
+    best_confidence = 0
+    
+    for img in images:
+        # tesserocr reads the array directly; pytesseract needs a PIL Image
+        if PyTessBaseAPI is not None:
+            ocr_img = np.ascontiguousarray(img)
+        else:
+            ocr_img = Image.fromarray(img)
+        
+        for psm in page_seg_modes:
+            try:
+                text, avg_conf = _ocr_with_psm(ocr_img, psm)
+                
+                # Keep best result
+                if avg_conf > best_confidence:
+                    best_confidence = avg_conf
+                    best_text = text
+                    # Other variants and modes won't meaningfully beat this
+                    if best_confidence >= GOOD_ENOUGH_CONFIDENCE:
+                        return best_text, best_confidence
+            except Exception as e:
+                logger.warning(f"OCR attempt failed: {e}")
+                continue
+    
+    return best_text, best_confidence
+
+def extract_text_from_image(image_path: str, thorough: bool = False) -> str:
+    """
+    Extract text from image using OCR with improved accuracy.
+    By default a single preprocessing and mode is tried first; the full search over all
+    preprocessed variants and modes runs only if that result has low confidence or thorough=True.
+    """
     try:
         # Read image
         image = Image.open(image_path)
@@ -22,75 +198,41 @@ def extract_text_from_image(image_path: str) -> str:
         if image.mode != 'RGB':
             image = image.convert('RGB')
         
-        # Convert to numpy array for OpenCV
-        img_array = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-        
-        # Resize if too large
-        max_width = 2000
-        if img_array.shape[1] > max_width:
-            scale = max_width / img_array.shape[1]
-            img_array = cv2.resize(img_array, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
-        
-        # Create multiple preprocessed versions
-        preprocessed_images = []
+        # Every variant below works on grayscale, so convert straight from the
+        # PIL buffer without an intermediate BGR copy
+        gray = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2GRAY)
         
-        # Version 1: Basic preprocessing
-        gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
-        preprocessed_images.append(gray)
+        # Scale so glyphs are about the height tesseract's LSTM is trained on,
+        # never wider than MAX_OCR_WIDTH (on one channel instead of three)
+        scale = MAX_OCR_WIDTH / gray.shape[1]
+        text_height = _estimate_text_height(gray)
+        if text_height:
+            scale = min(scale, TARGET_TEXT_HEIGHT / text_height)
+        if scale < 1 - RESCALE_TOLERANCE or (text_height and scale > 1 + RESCALE_TOLERANCE):
+            interpolation = cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
         
-        # Version 2: Adaptive thresholding
-        thresh = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY, 11, 2
-        )
-        preprocessed_images.append(thresh)
+        if not thorough:
+            best_text, best_confidence = _best_ocr_result(
+                [_select_preprocessing(gray)], OCR_PAGE_SEG_MODES[:1]
+            )
+            if best_confidence >= FAST_PATH_MIN_CONFIDENCE:
+                logger.debug(f"Best OCR confidence: {best_confidence}")
+                return best_text.strip()
+            logger.debug(f"Fast OCR pass confidence {best_confidence} too low, trying all variants")
         
-        # Version 3: Otsu's thresholding
-        _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        preprocessed_images.append(otsu)
-        
-        # Version 4: Contrast enhancement
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(gray)
-        preprocessed_images.append(enhanced)
-        
-        # Try different OCR configurations
-        best_text = ""
-        best_confidence = 0
-        
-        configs = [
-            '--oem 3 --psm 6 -l eng',  # Default
-            '--oem 3 --psm 3 -l eng',  # Full page
-            '--oem 3 --psm 11 -l eng', # Sparse text
-            '--oem 3 --psm 4 -l eng'   # Assume single column of text
+        # Create multiple preprocessed versions. With an OpenCL device, upload gray once
+        # and run the three filters on the device, downloading only the results.
+        src = cv2.UMat(gray) if cv2.ocl.useOpenCL() else gray
+        preprocessed_images = [
+            gray,                                  # Version 1: Basic preprocessing
+            _as_array(_adaptive_threshold(src)),   # Version 2: Adaptive thresholding
+            _as_array(_otsu_threshold(src)),       # Version 3: Otsu's thresholding
+            _as_array(_enhance_contrast(src)),     # Version 4: Contrast enhancement
         ]
         
-        for img in preprocessed_images:
-            # Convert back to PIL Image
-            pil_img = Image.fromarray(img)
-            
-            for config in configs:
-                try:
-                    # Get OCR data
-                    data = pytesseract.image_to_data(
-                        pil_img, config=config,
-                        output_type=pytesseract.Output.DICT
-                    )
-                    
-                    # Calculate confidence
-                    conf_values = [c for c in data['conf'] if c > 0]
-                    avg_conf = sum(conf_values) / len(conf_values) if conf_values else 0
-                    
-                    # Get text
-                    text = pytesseract.image_to_string(pil_img, config=config)
-                    
-                    # Keep best result
-                    if avg_conf > best_confidence:
-                        best_confidence = avg_conf
-                        best_text = text
-                except Exception as e:
-                    logger.warning(f"OCR attempt failed: {e}")
-                    continue
+        # Try different OCR configurations
+        best_text, best_confidence = _best_ocr_result(preprocessed_images, OCR_PAGE_SEG_MODES)
         
         logger.debug(f"Best OCR confidence: {best_confidence}")
         return best_text.strip()
@@ -102,29 +244,68 @@ def extract_text_from_image(image_path: str) -> str:
 def extract_text_from_pdf(pdf_path: str) -> List[str]:
     """Extract text from each page of a PDF file"""
     try:
-        # Convert PDF to images
-        images = pdf2image.convert_from_path(pdf_path)
-        
-        # Extract text from each page
-        texts = []
-        for image in images:
-            text = pytesseract.image_to_string(image)
-            texts.append(text)
-            
-        return texts
+        # Convert PDF to images, rendering pages in parallel
+        images = pdf2image.convert_from_path(pdf_path, thread_count=OCR_WORKERS)
+        
+        # Extract text from each page; tesseract releases the GIL (in-process or as a
+        # subprocess), so threads overlap the page OCR without pickling page images
+        if len(images) <= 1:
+            return [image_to_string(image) for image in images]
+        return list(_ocr_executor.map(image_to_string, images))
     except Exception as e:
         raise Exception(f"Failed to extract text from PDF: {str(e)}")
 
+# LRU cache of extract_text results keyed by (SHA-256 of file contents, file kind)
+OCR_CACHE_SIZE = 1024
+_ocr_cache: "OrderedDict[Tuple[str, str], Union[str, List[str]]]" = OrderedDict()
+_ocr_cache_lock = threading.Lock()
+
+def _file_sha256(file_path: str) -> str:
+    """Hash a file's contents without holding the whole file in memory where supported"""
+    with open(file_path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _get_cached_text(key: Tuple[str, str]) -> Optional[Union[str, List[str]]]:
+    """Return a copy of the cached OCR result for key, or None on a miss"""
+    with _ocr_cache_lock:
+        cached = _ocr_cache.get(key)
+        if cached is None:
+            return None
+        _ocr_cache.move_to_end(key)
+        return list(cached) if isinstance(cached, list) else cached
+
+def _cache_text(key: Tuple[str, str], text: Union[str, List[str]]) -> None:
+    """Store an OCR result, evicting the least recently used entry when full"""
+    with _ocr_cache_lock:
+        _ocr_cache[key] = list(text) if isinstance(text, list) else text
+        _ocr_cache.move_to_end(key)
+        if len(_ocr_cache) > OCR_CACHE_SIZE:
+            _ocr_cache.popitem(last=False)
+
 def extract_text(file_path: str) -> Union[str, List[str]]:
-    """Extract text from either an image or PDF file"""
+    """Extract text from either an image or PDF file, reusing results for identical file contents"""
     file_ext = os.path.splitext(file_path)[1].lower()
     
     if file_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-        return extract_text_from_image(file_path)
+        extract, kind = extract_text_from_image, 'image'
     elif file_ext == '.pdf':
-        return extract_text_from_pdf(file_path)
+        extract, kind = extract_text_from_pdf, 'pdf'
     else:
         raise ValueError(f"Unsupported file type: {file_ext}")
+    
+    key = (_file_sha256(file_path), kind)
+    cached = _get_cached_text(key)
+    if cached is not None:
+        logger.debug(f"Using cached OCR result for {file_path}")
+        return cached
+    
+    text = extract(file_path)
+    # Image OCR returns "" on failure; don't pin failures in the cache
+    if text:
+        _cache_text(key, text)
+    return text
 
 def save_upload_file(file_data: bytes, filename: str) -> str:
     """Save an uploaded file to a temporary location"""
@@ -136,6 +317,27 @@ def save_upload_file(file_data: bytes, filename: str) -> str:
         
     return file_path
 
+# Single-character OCR artifacts and their replacements
+_OCR_ARTIFACT_TABLE = str.maketrans({
+    '|': 'I',
+    '¢': 'C',
+    '°': '0',
+    '®': 'R',
+    '§': 'S',
+    '¥': 'Y',
+    '€': 'E',
+    '£': 'E',
+})
+_L_BEFORE_PUNCT_RE = re.compile(r'l([.,:;\-/])')
+_NON_TEXT_CHARS_RE = re.compile(r'[^A-Za-z0-9\s\-\.,/#\'"]')
+
+# Patterns that indicate poor OCR output, checked by validate_ocr_output
+_OCR_ERROR_PATTERNS = [
+    (re.compile(r'[^A-Za-z0-9\s\-\.,/#\'"\(\)]+'), 'Contains too many special characters'),
+    (re.compile(r'(.)\1{5,}'), 'Contains repeated character patterns'),
+    (re.compile(r'\d{10,}'), 'Contains unusually long number sequences')
+]
+
 def clean_ocr_text(text: str) -> str:
     """Clean up OCR output text"""
     if not text:
@@ -145,26 +347,13 @@ def clean_ocr_text(text: str) -> str:
     text = ' '.join(text.split())
     
     # Remove common OCR artifacts
-    text = text.replace('|', 'I')
-    text = text.replace('¢', 'C')
-    text = text.replace('°', '0')
-    text = text.replace('®', 'R')
-    text = text.replace('§', 'S')
-    text = text.replace('¥', 'Y')
-    text = text.replace('€', 'E')
-    text = text.replace('£', 'E')
-    text = text.replace('¢', 'c')
+    text = text.translate(_OCR_ARTIFACT_TABLE)
     
-    # Fix common OCR errors
-    text = text.replace('l.', 'I.')
-    text = text.replace('l,', 'I,')
-    text = text.replace('l:', 'I:')
-    text = text.replace('l;', 'I;')
-    text = text.replace('l-', 'I-')
-    text = text.replace('l/', 'I/')
+    # Fix common OCR errors: lowercase l read in place of I before punctuation
+    text = _L_BEFORE_PUNCT_RE.sub(r'I\1', text)
     
     # Remove non-alphanumeric characters except common punctuation
-    text = re.sub(r'[^A-Za-z0-9\s\-\.,/#\'"]', '', text)
+    text = _NON_TEXT_CHARS_RE.sub('', text)
     
     return text
 
@@ -193,19 +382,14 @@ def validate_ocr_output(text: str, confidence: float, doc_type: Optional[str] =
         key_terms = ['DOB', 'LIC', 'ID', 'DL', 'LICENSE', 'CARD', 'PASSPORT', 'EAD']
         required_count = 1
         
-    found_terms = sum(1 for term in key_terms if term in text.upper())
+    upper_text = text.upper()
+    found_terms = sum(1 for term in key_terms if term in upper_text)
     if found_terms < required_count:
         return f"Could not detect enough document markers (found {found_terms}/{required_count}), please upload a valid ID document"
         
     # Check for common error patterns
-    error_patterns = [
-        (r'[^A-Za-z0-9\s\-\.,/#\'"\(\)]+', 'Contains too many special characters'),
-        (r'(.)\1{5,}', 'Contains repeated character patterns'),
-        (r'\d{10,}', 'Contains unusually long number sequences')
-    ]
-    
-    for pattern, message in error_patterns:
-        if re.search(pattern, text):
+    for pattern, message in _OCR_ERROR_PATTERNS:
+        if pattern.search(text):
             return f"OCR quality issue: {message}"
             
     return None  # Validation passed 
\ No newline at end of file
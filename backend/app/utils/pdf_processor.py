@@ -3,33 +3,27 @@ from PIL import Image
 import io
 import os
 import logging
-import tempfile
 
 logger = logging.getLogger(__name__)
 
-def convert_pdf_to_image(pdf_path):
+def _convert_first_page(pdf_source, fitz_open_kwargs, pdf_label):
     """
-    Convert the first page of a PDF to a PIL Image using pikepdf.
+    Convert the first page of a PDF given as a path or stream to a PIL Image.
     
     Args:
-        pdf_path: Path to the PDF file
+        pdf_source: Path or binary stream accepted by pikepdf.Pdf.open
+        fitz_open_kwargs: Arguments for fitz.open to load the same PDF
+        pdf_label: Name of the PDF for log messages
         
     Returns:
         PIL Image object or None if conversion failed
     """
     try:
-        logger.debug(f"Converting PDF to image: {pdf_path}")
-        
-        # Check if file exists
-        if not os.path.exists(pdf_path):
-            logger.error(f"PDF file not found: {pdf_path}")
-            return None
-            
         # Open the PDF
-        with pikepdf.Pdf.open(pdf_path) as pdf:
+        with pikepdf.Pdf.open(pdf_source) as pdf:
             # Check if PDF has pages
             if len(pdf.pages) == 0:
-                logger.warning(f"PDF has no pages: {pdf_path}")
+                logger.warning(f"PDF has no pages: {pdf_label}")
                 return None
                 
             # Get the first page
@@ -53,23 +47,37 @@ def convert_pdf_to_image(pdf_path):
             # since we already have it installed
             logger.debug("No embedded images found, using PyMuPDF as fallback")
             import fitz
-            doc = fitz.open(pdf_path)
-            page = doc.load_page(0)
-            pix = page.get_pixmap()
+            with fitz.open(**fitz_open_kwargs) as doc:
+                page = doc.load_page(0)
+                pix = page.get_pixmap()
             
-            # Create a temporary file to save the image
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-                pix.save(tmp.name)
-                img = Image.open(tmp.name)
-                img_copy = img.copy()  # Copy before closing file
-                
-            # Return the image
-            return img_copy
+            # Build the image straight from the pixmap samples; no PNG round trip
+            mode = "RGBA" if pix.alpha else "RGB"
+            return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
             
     except Exception as e:
         logger.error(f"Error converting PDF to image: {e}")
         return None
 
+def convert_pdf_to_image(pdf_path):
+    """
+    Convert the first page of a PDF to a PIL Image using pikepdf.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        
+    Returns:
+        PIL Image object or None if conversion failed
+    """
+    logger.debug(f"Converting PDF to image: {pdf_path}")
+    
+    # Check if file exists
+    if not os.path.exists(pdf_path):
+        logger.error(f"PDF file not found: {pdf_path}")
+        return None
+        
+    return _convert_first_page(pdf_path, {"filename": pdf_path}, pdf_path)
+
 def convert_pdf_bytes_to_image(pdf_bytes):
     """
     Convert PDF bytes to a PIL Image.
@@ -81,19 +89,10 @@ def convert_pdf_bytes_to_image(pdf_bytes):
         Tuple of (image_bytes, error_message)
     """
     try:
-        # Create a temporary file to save the PDF
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_pdf:
-            tmp_pdf.write(pdf_bytes)
-            tmp_pdf_path = tmp_pdf.name
-        
-        # Convert the PDF to an image
-        img = convert_pdf_to_image(tmp_pdf_path)
-        
-        # Clean up the temporary PDF file
-        try:
-            os.unlink(tmp_pdf_path)
-        except Exception as e:
-            logger.warning(f"Failed to delete temporary PDF file: {e}")
+        # Convert the PDF to an image in memory
+        img = _convert_first_page(
+            io.BytesIO(pdf_bytes), {"stream": pdf_bytes, "filetype": "pdf"}, "<uploaded bytes>"
+        )
         
         if img:
             # Convert the image to bytes
@@ -1,4 +1,5 @@
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, List
 import torch
 from transformers import (
@@ -7,31 +8,36 @@ from transformers import (
     LayoutLMForSequenceClassification,
     BertForSequenceClassification
 )
-import pytesseract
 from PIL import Image
 import numpy as np
 from pathlib import Path
 import json
+from app.utils.ocr import image_to_string
 
 class ModelBenchmark:
+    # Models whose processors accept a list of images and run one forward pass per batch
+    BATCHED_MODELS = ('layoutlmv2', 'layoutlm')
+    
     def __init__(self, test_data_dir: str):
         self.test_data_dir = Path(test_data_dir)
         self.results = {}
+        # Run transformer inference on the GPU in FP16 when one is available
+        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         
     def setup_models(self):
         """Initialize all models for comparison"""
         self.models = {
             'layoutlmv2': {
                 'processor': LayoutLMv2Processor.from_pretrained("microsoft/layoutlmv2-base-uncased"),
-                'model': LayoutLMv2ForSequenceClassification.from_pretrained("microsoft/layoutlmv2-base-uncased")
+                'model': self._prepare_model(LayoutLMv2ForSequenceClassification.from_pretrained("microsoft/layoutlmv2-base-uncased"))
             },
             'layoutlm': {
                 'processor': LayoutLMForSequenceClassification.from_pretrained("microsoft/layoutlm-base-uncased"),
-                'model': LayoutLMForSequenceClassification.from_pretrained("microsoft/layoutlm-base-uncased")
+                'model': self._prepare_model(LayoutLMForSequenceClassification.from_pretrained("microsoft/layoutlm-base-uncased"))
             },
             'bert': {
                 'processor': None,  # Using Tesseract for text extraction
-                'model': BertForSequenceClassification.from_pretrained("bert-base-uncased")
+                'model': self._prepare_model(BertForSequenceClassification.from_pretrained("bert-base-uncased"))
             },
             'tesseract': {
                 'processor': None,
@@ -39,6 +45,16 @@ class ModelBenchmark:
             }
         }
         
+    def _prepare_model(self, model):
+        """Move a model to the benchmark device in inference mode"""
+        return model.to(self.device).eval()
+        
+    def _run_model(self, model, inputs):
+        """Run inference without autograd, autocasting to FP16 on CUDA"""
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        with torch.inference_mode(), torch.autocast(self.device.type, dtype=torch.float16, enabled=self.device.type == 'cuda'):
+            return model(**inputs)
+        
     def benchmark_model(self, model_name: str, image_path: str) -> Dict:
         """Benchmark a single model on one image"""
         start_time = time.time()
@@ -50,22 +66,22 @@ class ModelBenchmark:
             model = self.models[model_name]['model']
             
             encoding = processor(image, return_tensors="pt")
-            outputs = model(**encoding)
+            outputs = self._run_model(model, encoding)
             
         elif model_name == 'bert':
             # Extract text with Tesseract, then process with BERT
             image = Image.open(image_path)
-            text = pytesseract.image_to_string(image)
+            text = image_to_string(image)
             model = self.models[model_name]['model']
             
             # Process text with BERT
             inputs = model.tokenizer(text, return_tensors="pt")
-            outputs = model(**inputs)
+            outputs = self._run_model(model, inputs)
             
         else:  # tesseract
             # Basic OCR
             image = Image.open(image_path)
-            text = pytesseract.image_to_string(image)
+            text = image_to_string(image)
             outputs = {'text': text}
             
         end_time = time.time()
@@ -75,23 +91,108 @@ class ModelBenchmark:
             'outputs': outputs
         }
         
-    def run_benchmarks(self):
-        """Run benchmarks on all test images"""
+    def benchmark_model_batch(self, model_name: str, image_paths: List[str]) -> Dict:
+        """
+        Benchmark a LayoutLM model on a batch of images in one forward pass.
+        Timing is reported for the batch as a whole, since per-image shares of it would not be
+        comparable with the single-image latencies of the other models.
+        """
+        start_time = time.time()
+        
+        images = [Image.open(image_path) for image_path in image_paths]
+        processor = self.models[model_name]['processor']
+        model = self.models[model_name]['model']
+        
+        encoding = processor(images, return_tensors="pt", padding=True)
+        outputs = self._run_model(model, encoding)
+        
+        batch_time = time.time() - start_time
+        
+        return {
+            'batch_size': len(image_paths),
+            'batch_time': batch_time,
+            'images_per_second': len(image_paths) / batch_time,
+            'outputs': {
+                image_path: {'logits': outputs.logits[i]}
+                for i, image_path in enumerate(image_paths)
+            }
+        }
+        
+    def run_benchmarks(self, max_workers: int = 1, batch_size: int = 8):
+        """
+        Run benchmarks on all test images.
+        By default model/image pairs run one at a time, so each processing_time is an uncontended latency.
+        With max_workers > 1 they run concurrently on a thread pool; contended per-image times are
+        dropped and the run's total wall-clock time and throughput are recorded instead.
+        LayoutLM models run batch_size images per forward pass; their timings are recorded per batch
+        under '<model>_batches' rather than per image.
+        """
         self.setup_models()
         
-        # Process each test image
-        for image_path in self.test_data_dir.glob('*.png'):
-            image_results = {}
-            
-            # Test each model
+        image_paths = sorted(self.test_data_dir.glob('*.png'))
+        concurrent = max_workers > 1
+        completed = 0
+        run_start = time.time()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Submit every model for every test image, batching the LayoutLM models
+            futures = {}
+            batch_futures = []
             for model_name in self.models.keys():
+                if model_name in self.BATCHED_MODELS:
+                    for i in range(0, len(image_paths), batch_size):
+                        batch = image_paths[i:i + batch_size]
+                        future = executor.submit(self.benchmark_model_batch, model_name, [str(p) for p in batch])
+                        batch_futures.append((model_name, batch, future))
+                else:
+                    for image_path in image_paths:
+                        futures[(image_path, model_name)] = executor.submit(
+                            self.benchmark_model, model_name, str(image_path)
+                        )
+            
+            # Record batch-level timings separately from per-image latencies. A failed batch is
+            # rerun image by image, so one unreadable image only loses its own result.
+            for model_name, batch, future in batch_futures:
                 try:
-                    results = self.benchmark_model(model_name, str(image_path))
-                    image_results[model_name] = results
+                    batch_results = future.result()
                 except Exception as e:
-                    print(f"Error benchmarking {model_name} on {image_path}: {str(e)}")
-                    
-            self.results[image_path.name] = image_results
+                    print(f"Error benchmarking {model_name} on a batch of {len(batch)}, retrying per image: {str(e)}")
+                    for image_path in batch:
+                        futures[(image_path, model_name)] = executor.submit(
+                            self.benchmark_model, model_name, str(image_path)
+                        )
+                    continue
+                
+                batch_outputs = batch_results.pop('outputs')
+                if not concurrent:
+                    batch_results['images'] = [image_path.name for image_path in batch]
+                    self.results.setdefault(f"{model_name}_batches", []).append(batch_results)
+                for image_path in batch:
+                    image_future = Future()
+                    image_future.set_result({'outputs': batch_outputs[str(image_path)]})
+                    futures[(image_path, model_name)] = image_future
+            
+            # Collect results in image/model order
+            for image_path in image_paths:
+                image_results = {}
+                for model_name in self.models.keys():
+                    try:
+                        results = futures[(image_path, model_name)].result()
+                        if concurrent:
+                            results = {k: v for k, v in results.items() if k != 'processing_time'}
+                        image_results[model_name] = results
+                        completed += 1
+                    except Exception as e:
+                        print(f"Error benchmarking {model_name} on {image_path}: {str(e)}")
+                        
+                self.results[image_path.name] = image_results
+        
+        if concurrent:
+            wall_time = time.time() - run_start
+            self.results['concurrent_run'] = {
+                'max_workers': max_workers,
+                'wall_time': wall_time,
+                'pairs_per_second': completed / wall_time
+            }
             
     def evaluate_accuracy(self, ground_truth_file: str):
         """Evaluate accuracy against ground truth data"""
@@ -136,7 +237,7 @@ class ModelBenchmark:
             json.dump(self.results, f, indent=2)
             
 if __name__ == "__main__":
-    # Run benchmarks
+    # Run from backend/ as `python -m benchmarks.model_comparison` so the app package is importable
     benchmark = ModelBenchmark("tests/test_data")
     benchmark.run_benchmarks()
     benchmark.evaluate_accuracy("tests/ground_truth.json")
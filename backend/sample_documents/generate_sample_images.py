@@ -1,6 +1,25 @@
 from PIL import Image, ImageDraw, ImageFont
 import os
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+# Vertical distance between detail lines, in pixels
+LINE_PITCH = 40
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    """Load Arial at the given size once, falling back to the default font"""
+    try:
+        # Try to use Arial font if available
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        # Fallback to default font if Arial is not available
+        return ImageFont.load_default()
+
+def draw_lines(draw, x, y, lines, fill, font):
+    """Draw lines of text LINE_PITCH apart in a single multiline_text call"""
+    line_height = draw.textbbox((0, 0), "A", font=font)[3]
+    draw.multiline_text((x, y), "\n".join(lines), fill=fill, font=font, spacing=LINE_PITCH - line_height)
 
 def create_sample_passport():
     # Create a new image with a dark blue background
@@ -9,33 +28,25 @@ def create_sample_passport():
     image = Image.new('RGB', (width, height), color='#000B4F')
     draw = ImageDraw.Draw(image)
 
-    try:
-        # Try to use Arial font if available
-        font = ImageFont.truetype("arial.ttf", 36)
-        small_font = ImageFont.truetype("arial.ttf", 24)
-    except:
-        # Fallback to default font if Arial is not available
-        font = ImageFont.load_default()
-        small_font = ImageFont.load_default()
+    font = load_font(36)
 
     # Add passport details
+    draw.text((50, 50), "PASSPORT", fill='white', font=font)
     details = [
-        ("PASSPORT", 50),
-        ("Type: P", 120),
-        ("Country Code: USA", 160),
-        ("Passport No: 999999999", 200),
-        ("Surname: DOE", 240),
-        ("Given Names: JOHN JAMES", 280),
-        ("Nationality: UNITED STATES OF AMERICA", 320),
-        ("Date of Birth: 01 JAN 1990", 360),
-        ("Place of Birth: NEW YORK, USA", 400),
-        ("Date of Issue: 01 JAN 2020", 440),
-        ("Date of Expiry: 01 JAN 2030", 480),
+        "Type: P",
+        "Country Code: USA",
+        "Passport No: 999999999",
+        "Surname: DOE",
+        "Given Names: JOHN JAMES",
+        "Nationality: UNITED STATES OF AMERICA",
+        "Date of Birth: 01 JAN 1990",
+        "Place of Birth: NEW YORK, USA",
+        "Date of Issue: 01 JAN 2020",
+        "Date of Expiry: 01 JAN 2030",
     ]
 
     # Add text in white color
-    for text, y_pos in details:
-        draw.text((50, y_pos), text, fill='white', font=font)
+    draw_lines(draw, 50, 120, details, 'white', font)
 
     return image
 
@@ -46,12 +57,7 @@ def create_sample_drivers_license():
     image = Image.new('RGB', (width, height), color='#FFFFFF')
     draw = ImageDraw.Draw(image)
 
-    try:
-        font = ImageFont.truetype("arial.ttf", 30)
-        small_font = ImageFont.truetype("arial.ttf", 20)
-    except:
-        font = ImageFont.load_default()
-        small_font = ImageFont.load_default()
+    font = load_font(30)
 
     # Add header
     draw.rectangle([0, 0, width, 80], fill='#1C4F9C')
@@ -59,20 +65,19 @@ def create_sample_drivers_license():
 
     # Add driver's license details
     details = [
-        ("DL NO: X12345678", 100),
-        ("CLASS: D", 140),
-        ("END: 01/01/2025", 180),
-        ("DOB: 01/01/1990", 220),
-        ("ISS: 01/01/2020", 260),
-        ("NAME: DOE, JOHN JAMES", 300),
-        ("ADD: 123 MAIN ST", 340),
-        ("       NEW YORK, NY 10001", 380),
-        ("REST: NONE", 420),
+        "DL NO: X12345678",
+        "CLASS: D",
+        "END: 01/01/2025",
+        "DOB: 01/01/1990",
+        "ISS: 01/01/2020",
+        "NAME: DOE, JOHN JAMES",
+        "ADD: 123 MAIN ST",
+        "       NEW YORK, NY 10001",
+        "REST: NONE",
     ]
 
     # Add text in black color
-    for text, y_pos in details:
-        draw.text((20, y_pos), text, fill='black', font=font)
+    draw_lines(draw, 20, 100, details, 'black', font)
 
     return image
 
@@ -83,12 +88,8 @@ def create_sample_ead():
     image = Image.new('RGB', (width, height), color='#FFFFFF')
     draw = ImageDraw.Draw(image)
 
-    try:
-        font = ImageFont.truetype("arial.ttf", 30)
-        small_font = ImageFont.truetype("arial.ttf", 20)
-    except:
-        font = ImageFont.load_default()
-        small_font = ImageFont.load_default()
+    font = load_font(30)
+    small_font = load_font(20)
 
     # Add header
     draw.rectangle([0, 0, width, 80], fill='#8B0000')
@@ -96,18 +97,17 @@ def create_sample_ead():
 
     # Add EAD details
     details = [
-        ("USCIS#: 999-999-999", 100),
-        ("CARD#: AAA1234567890", 140),
-        ("NAME: DOE, JOHN JAMES", 180),
-        ("DOB: 01/01/1990", 220),
-        ("CATEGORY: C08", 260),
-        ("VALID FROM: 01/01/2023", 300),
-        ("EXPIRES: 01/01/2024", 340),
+        "USCIS#: 999-999-999",
+        "CARD#: AAA1234567890",
+        "NAME: DOE, JOHN JAMES",
+        "DOB: 01/01/1990",
+        "CATEGORY: C08",
+        "VALID FROM: 01/01/2023",
+        "EXPIRES: 01/01/2024",
     ]
 
     # Add text in black color
-    for text, y_pos in details:
-        draw.text((20, y_pos), text, fill='black', font=font)
+    draw_lines(draw, 20, 100, details, 'black', font)
 
     return image
 
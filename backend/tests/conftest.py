@@ -0,0 +1,67 @@
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+import pytest
+from PIL import Image
+
+
+@lru_cache(maxsize=None)
+def _test_image(width, height):
+    """Draw a document-like test image of the given size"""
+    arr = np.full((height, width, 3), 240, dtype=np.uint8)
+
+    # Add a dark rectangle to avoid blank image detection
+    arr[int(height * 0.2):int(height * 0.8) + 1, int(width * 0.2):int(width * 0.8) + 1] = 30
+
+    # Add some 3px text-like lines to simulate content, written in one indexed store
+    line_rows = (np.round(height * (0.3 + 0.1 * np.arange(5))).astype(int)[:, None] + [-1, 0, 1]).ravel()
+    arr[line_rows, int(width * 0.3):int(width * 0.7) + 1] = 200
+
+    return Image.fromarray(arr)
+
+
+@pytest.fixture
+def make_test_image():
+    """Factory returning a PIL test image; each size is drawn once and callers get their own copy"""
+    def _make(width, height):
+        return _test_image(width, height).copy()
+    return _make
+
+
+@pytest.fixture(scope="session")
+def processor():
+    """One DocumentProcessor shared by every test; it holds no per-document state"""
+    # Imported here so collecting tests that never process a document stays cheap
+    from app.services.document_processor import DocumentProcessor
+    return DocumentProcessor()
+
+
+@pytest.fixture(scope="session")
+def fastapi_app():
+    """The application under test, imported on first use and shared by every API test module"""
+    from main import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def process_image_cached(processor):
+    """
+    processor.process_image memoized on a digest of the image bytes, so identical documents are
+    processed once per session. Tests that patch the extraction must call process_image directly.
+    """
+    results = {}
+
+    def _process(image_bytes):
+        key = hashlib.blake2b(image_bytes, digest_size=16).digest()
+        if key not in results:
+            results[key] = processor.process_image(image_bytes)
+        return results[key]
+
+    return _process
+
+
+@pytest.fixture(scope="session")
+def test_dir(tmp_path_factory):
+    """Temporary directory for images generated by tests, created once per session and cleaned up by pytest"""
+    return str(tmp_path_factory.mktemp("consistency"))
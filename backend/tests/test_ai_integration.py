@@ -1,62 +1,147 @@
 import pytest
 import os
 import json
-from unittest.mock import patch, MagicMock
-from app.utils.ai import get_gpt_extraction, get_gpt_classification
-from app.services.document_processor import DocumentProcessor
+import base64
+from io import BytesIO
+from PIL import Image
+from types import SimpleNamespace
+from collections import OrderedDict
+from unittest.mock import patch
+from app.utils import ai
+from app.utils.ai import (
+    get_gpt_extraction, get_gpt_classification, _extract_json_object, _read_streamed_response, _prepare_vision_image,
+    VISION_MAX_DIMENSION
+)
+from tests.util import as_map
+
+# Mock GPT response bodies, serialized once at import
+_PASSPORT_MOCK_JSON = json.dumps({
+    "document_type": "PASSPORT",
+    "passport_number": "123456789",
+    "full_name": "JOHN SMITH",
+    "nationality": "UNITED STATES OF AMERICA",
+    "date_of_birth": "15JAN1985",
+    "date_of_issue": "01JAN2020",
+    "date_of_expiry": "01JAN2030"
+})
+_DL_MOCK_JSON = json.dumps({
+    "document_type": "DRIVER LICENSE",
+    "license_number": "D1234567",
+    "first_name": "JOHN",
+    "last_name": "SMITH",
+    "date_of_birth": "05/15/1990",
+    "issue_date": "01/01/2020",
+    "expiration_date": "05/15/2025"
+})
+_EAD_MOCK_JSON = json.dumps({
+    "document_type": "EMPLOYMENT AUTHORIZATION",
+    "card_number": "EAD1234567890",
+    "first_name": "MARIA",
+    "last_name": "GARCIA",
+    "category": "C09",
+    "card_expires_date": "01/01/2025"
+})
+_PARTIAL_PASSPORT_MOCK_JSON = json.dumps({
+    "document_type": "PASSPORT",
+    # Missing other fields
+})
+
+class _MockStream:
+    """Chat completion chunks shaped like the OpenAI client's stream=True response, recording close()"""
+    def __init__(self, pieces):
+        self._chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+            for piece in pieces
+        ]
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            self.consumed += 1
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+def _mock_response(content, chunk_size=16):
+    """Stream content back in chunk_size pieces, the way the API returns it with stream=True"""
+    return _MockStream([content[i:i + chunk_size] for i in range(0, len(content), chunk_size)])
+
+@pytest.fixture(autouse=True)
+def empty_extraction_cache(monkeypatch):
+    """Give each test its own extraction cache so a result cached by one mock isn't served to the next"""
+    monkeypatch.setattr(ai, "_extraction_cache", OrderedDict())
+
+def test_streamed_response_stops_at_json_object():
+    """Reading stops and the stream is closed once the first JSON object is complete"""
+    stream = _MockStream([
+        None,  # Role-only first chunk carries no content
+        'Here you go: {"document_type": "PASS',
+        'PORT", "note": "a } in',
+        ' a string"}',
+        ' and some trailing tokens',
+        ' that are never read',
+    ])
+
+    text = _read_streamed_response(stream)
+
+    assert stream.closed
+    assert stream.consumed == 4
+    assert json.loads(_extract_json_object(text)) == {"document_type": "PASSPORT", "note": "a } in a string"}
+
+def test_prepare_vision_image_applies_exif_orientation():
+    """An oversized JPEG tagged Orientation=6 is re-encoded upright, since the re-encode drops EXIF"""
+    # Landscape as stored, with its left edge dark; shown rotated 90 degrees clockwise that edge is on top
+    stored = Image.new('RGB', (2400, 1200), color='white')
+    stored.paste((0, 0, 0), (0, 0, 200, 1200))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW to display
+    buf = BytesIO()
+    stored.save(buf, format='JPEG', exif=exif)
+
+    with Image.open(BytesIO(base64.b64decode(_prepare_vision_image(buf.getvalue())))) as sent:
+        assert sent.size == (VISION_MAX_DIMENSION // 2, VISION_MAX_DIMENSION)
+        assert sent.getexif().get(0x0112) is None
+        assert sent.getpixel((sent.width // 2, 10))[0] < 50
+        assert sent.getpixel((sent.width // 2, sent.height - 10))[0] > 200
+
+def test_oversized_image_rejected_before_read(tmp_path):
+    """Files over the size limit are turned away from their stat alone, without being read or hashed"""
+    image_path = tmp_path / "huge.jpg"
+    with open(image_path, 'wb') as f:
+        f.truncate(ai.MAX_IMAGE_FILE_SIZE + 1)
+
+    with patch('app.utils.ai._extraction_cache_key') as cache_key, patch('app.utils.ai.client') as mock_client:
+        fields = get_gpt_extraction(str(image_path), "passport", ["document_type"])
+
+    assert fields == {"document_type": "NOT_FOUND"}
+    cache_key.assert_not_called()
+    mock_client.chat.completions.create.assert_not_called()
 
 class TestAIModelIntegration:
-    @pytest.fixture
-    def processor(self):
-        return DocumentProcessor()
-    
-    @pytest.fixture
-    def test_dir(self):
-        base_dir = "tests/test_data/ai_integration"
-        os.makedirs(base_dir, exist_ok=True)
-        return base_dir
-    
-    @patch('app.utils.ai.openai')
-    def test_gpt_extraction_passport(self, mock_openai, processor):
+    @patch('app.utils.ai.client')
+    def test_gpt_extraction_passport(self, mock_client, processor):
         """Test GPT-4 Vision extraction for passport data"""
         # Mock the OpenAI API response
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = json.dumps({
-            "document_type": "PASSPORT",
-            "passport_number": "123456789",
-            "full_name": "JOHN SMITH",
-            "nationality": "UNITED STATES OF AMERICA",
-            "date_of_birth": "15JAN1985",
-            "date_of_issue": "01JAN2020",
-            "date_of_expiry": "01JAN2030"
-        })
-        mock_openai.ChatCompletion.create.return_value = mock_response
+        mock_client.chat.completions.create.return_value = _mock_response(_PASSPORT_MOCK_JSON)
         
         # Call the extraction function
         image_path = os.path.join(os.path.dirname(__file__), "..", "..", "test_data", "pp_test.png")
         fields = get_gpt_extraction(image_path, "passport", ["document_type", "passport_number", "full_name", "nationality", "date_of_birth", "date_of_issue", "date_of_expiry"])
         
         # Validate the extracted fields
+        assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
         assert fields["document_type"] == "PASSPORT"
         assert fields["passport_number"] == "123456789"
         assert fields["full_name"] == "JOHN SMITH"
         assert fields["date_of_birth"] == "15JAN1985"
     
-    @patch('app.utils.ai.openai')
-    def test_gpt_extraction_drivers_license(self, mock_openai, processor):
+    @patch('app.utils.ai.client')
+    def test_gpt_extraction_drivers_license(self, mock_client, processor):
         """Test GPT-4 Vision extraction for driver's license data"""
         # Mock the OpenAI API response
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = json.dumps({
-            "document_type": "DRIVER LICENSE",
-            "license_number": "D1234567",
-            "first_name": "JOHN",
-            "last_name": "SMITH",
-            "date_of_birth": "05/15/1990",
-            "issue_date": "01/01/2020",
-            "expiration_date": "05/15/2025"
-        })
-        mock_openai.ChatCompletion.create.return_value = mock_response
+        mock_client.chat.completions.create.return_value = _mock_response(_DL_MOCK_JSON)
         
         # Call the extraction function
         image_path = os.path.join(os.path.dirname(__file__), "..", "..", "test_data", "dl_test.png")
@@ -69,20 +154,11 @@ class TestAIModelIntegration:
         assert fields["last_name"] == "SMITH"
         assert fields["date_of_birth"] == "05/15/1990"
     
-    @patch('app.utils.ai.openai')
-    def test_gpt_extraction_ead_card(self, mock_openai, processor):
+    @patch('app.utils.ai.client')
+    def test_gpt_extraction_ead_card(self, mock_client, processor):
         """Test GPT-4 Vision extraction for EAD card data"""
         # Mock the OpenAI API response
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = json.dumps({
-            "document_type": "EMPLOYMENT AUTHORIZATION",
-            "card_number": "EAD1234567890",
-            "first_name": "MARIA",
-            "last_name": "GARCIA",
-            "category": "C09",
-            "card_expires_date": "01/01/2025"
-        })
-        mock_openai.ChatCompletion.create.return_value = mock_response
+        mock_client.chat.completions.create.return_value = _mock_response(_EAD_MOCK_JSON)
         
         # Call the extraction function
         image_path = os.path.join(os.path.dirname(__file__), "..", "..", "test_data", "ead_test.png")
@@ -95,11 +171,11 @@ class TestAIModelIntegration:
         assert fields["last_name"] == "GARCIA"
         assert fields["category"] == "C09"
     
-    @patch('app.utils.ai.openai')
-    def test_error_handling(self, mock_openai, processor):
+    @patch('app.utils.ai.client')
+    def test_error_handling(self, mock_client, processor):
         """Test error handling when GPT API fails"""
         # Mock an error in the OpenAI API
-        mock_openai.ChatCompletion.create.side_effect = Exception("API Error")
+        mock_client.chat.completions.create.side_effect = Exception("API Error")
         
         # Call the extraction function and verify it returns None on error
         image_path = os.path.join(os.path.dirname(__file__), "..", "..", "test_data", "pp_test.png")
@@ -107,13 +183,11 @@ class TestAIModelIntegration:
         
         assert fields is None
     
-    @patch('app.utils.ai.openai')
-    def test_malformed_response(self, mock_openai, processor):
+    @patch('app.utils.ai.client')
+    def test_malformed_response(self, mock_client, processor):
         """Test handling of malformed responses from GPT API"""
         # Mock a non-JSON response
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = "This is not a JSON response"
-        mock_openai.ChatCompletion.create.return_value = mock_response
+        mock_client.chat.completions.create.return_value = _mock_response("This is not a JSON response")
         
         # Call the extraction function and verify it handles the error
         image_path = os.path.join(os.path.dirname(__file__), "..", "..", "test_data", "pp_test.png")
@@ -122,16 +196,11 @@ class TestAIModelIntegration:
         # Should either return None or an empty dict (depending on implementation)
         assert fields is None or fields == {}
     
-    @patch('app.utils.ai.openai')
-    def test_partial_fields(self, mock_openai, processor):
+    @patch('app.utils.ai.client')
+    def test_partial_fields(self, mock_client, processor):
         """Test handling of partial field extraction"""
         # Mock a response with only some fields
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = json.dumps({
-            "document_type": "PASSPORT",
-            # Missing other fields
-        })
-        mock_openai.ChatCompletion.create.return_value = mock_response
+        mock_client.chat.completions.create.return_value = _mock_response(_PARTIAL_PASSPORT_MOCK_JSON)
         
         # Call the extraction function
         image_path = os.path.join(os.path.dirname(__file__), "..", "..", "test_data", "pp_test.png")
@@ -141,16 +210,12 @@ class TestAIModelIntegration:
         assert fields["document_type"] == "PASSPORT"
         assert "passport_number" not in fields or fields["passport_number"] is None
     
+    @pytest.mark.skipif("OPENAI_API_KEY" not in os.environ, reason="No OpenAI API key available")
     def test_end_to_end_document_processing(self, processor):
         """
         Test the entire document processing pipeline
         This test requires an actual OpenAI API key to run
         """
-        # Skip if no API key is available
-        import os
-        if "OPENAI_API_KEY" not in os.environ:
-            pytest.skip("No OpenAI API key available")
-        
         # Test with a sample image
         image_path = os.path.join(os.path.dirname(__file__), "..", "..", "test_data", "pp_test.png")
         with open(image_path, "rb") as f:
@@ -175,7 +240,7 @@ class TestAIModelIntegration:
             required_fields = []
         
         # Convert fields list to a map for easier checking
-        field_map = {f["field_name"]: f["field_value"] for f in fields}
+        field_map = as_map(fields)
         
         # Check that required fields are present
         for field in required_fields:
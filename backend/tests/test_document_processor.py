@@ -1,42 +1,43 @@
 import pytest
 from datetime import datetime
-from app.services.document_processor import DocumentProcessor
-from PIL import Image
-import os
+from tests.util import as_map
+from PIL import Image, ImageDraw, ImageFont
 import io
+from functools import lru_cache
 
-class TestDocumentProcessor:
-    @pytest.fixture
-    def processor(self):
-        return DocumentProcessor()
-
-    @pytest.fixture
-    def test_images_dir(self):
-        """Create synthetic test images with known content"""
-        base_dir = "test_data"
-        os.makedirs(base_dir, exist_ok=True)
-        return base_dir
+@pytest.fixture(scope="session")
+def doc_font():
+    """Font for synthetic document text, loaded once per session"""
+    try:
+        return ImageFont.truetype("arial.ttf", 24)
+    except IOError:
+        return ImageFont.load_default()
 
-    def create_synthetic_image(self, text, path):
-        """Create a test image with specific text content"""
+@pytest.fixture(scope="session")
+def synthetic_image(doc_font):
+    """
+    Factory that renders text onto a document-like test image and returns the encoded bytes.
+    Results are cached by text, so each distinct text is drawn and encoded only once.
+    """
+    @lru_cache(maxsize=None)
+    def _make(text):
         img = Image.new('RGB', (800, 600), color=(220, 220, 220))  # light gray background
-        from PIL import ImageDraw, ImageFont
         draw = ImageDraw.Draw(img)
         # Draw a large rectangle to ensure the image is not blank
         draw.rectangle([20, 20, 780, 580], outline=(180, 180, 180), width=10)
-        try:
-            font = ImageFont.truetype("arial.ttf", 24)
-        except IOError:
-            font = ImageFont.load_default()
         # Draw the text in multiple lines if needed
         y = 60
         for line in text.split('\n'):
-            draw.text((60, y), line, fill='black', font=font)
+            draw.text((60, y), line, fill='black', font=doc_font)
             y += 40
-        img.save(path)
-        return path
+        buf = io.BytesIO()
+        img.save(buf, format="BMP")
+        return buf.getvalue()
+
+    return _make
 
-    def test_field_extraction(self, processor, test_images_dir):
+class TestDocumentProcessor:
+    def test_field_extraction(self, process_image_cached, synthetic_image):
         """Test field extraction from documents"""
         dl_content = """
         DRIVER LICENSE
@@ -47,67 +48,62 @@ class TestDocumentProcessor:
         123 MAIN ST
         ANYTOWN, CA 12345
         """
-        dl_path = self.create_synthetic_image(dl_content, f"{test_images_dir}/dl_fields.png")
-        with open(dl_path, 'rb') as f:
-            doc_type, fields, error = processor.process_image(f.read())
+        doc_type, fields, error = process_image_cached(synthetic_image(dl_content))
         assert doc_type == "drivers_license"
-        field_map = {f["field_name"]: f["field_value"] for f in fields}
+        field_map = as_map(fields)
         assert field_map["license_number"] == "A1234567"
         assert field_map["date_of_birth"] in ["1990-01-15", "01/15/1990"]
         assert field_map["expiration_date"] in ["2025-01-15", "01/15/2025"]
         assert error is None or "missing" in error.lower() or error == "Critical fields missing - manual review required"
 
-    def test_process_image_drivers_license(self, processor, test_images_dir):
+    def test_process_image_drivers_license(self, process_image_cached, synthetic_image):
         text = """
         DRIVER LICENSE\nDL A1234567\nDOB 01/15/1990\nEXP 01/15/2025\nNAME JOHN A SMITH\n123 MAIN ST\nANYTOWN, CA 12345
         """
-        img_path = self.create_synthetic_image(text, f"{test_images_dir}/dl_fields.png")
-        with open(img_path, 'rb') as f:
-            img_bytes = f.read()
-        doc_type, fields, error = processor.process_image(img_bytes)
+        img_bytes = synthetic_image(text)
+        doc_type, fields, error = process_image_cached(img_bytes)
         assert doc_type == "drivers_license"
-        field_map = {f["field_name"]: f["field_value"] for f in fields}
+        field_map = as_map(fields)
         assert field_map["license_number"] == "A1234567"
         assert field_map["date_of_birth"] in ["1990-01-15", "01/15/1990"]
         assert field_map["expiration_date"] in ["2025-01-15", "01/15/2025"]
         assert error is None or "missing" in error.lower() or error == "Critical fields missing - manual review required"
 
-    def test_process_image_passport(self, processor, test_images_dir):
+    def test_process_image_passport(self, process_image_cached, synthetic_image):
         text = """
         PASSPORT\nPASSPORT NO: P123456789\nSURNAME: SMITH\nGIVEN NAMES: JOHN\nNATIONALITY: USA\nDOB: 15JAN1985
         """
-        img_path = self.create_synthetic_image(text, f"{test_images_dir}/pp_test.png")
-        with open(img_path, 'rb') as f:
-            img_bytes = f.read()
-        doc_type, fields, error = processor.process_image(img_bytes)
+        img_bytes = synthetic_image(text)
+        doc_type, fields, error = process_image_cached(img_bytes)
         assert doc_type == "passport"
-        field_map = {f["field_name"]: f["field_value"] for f in fields}
+        field_map = as_map(fields)
         assert field_map["document_number"] == "P123456789"
         assert field_map["last_name"] == "SMITH"
         assert field_map["first_name"] == "JOHN"
         assert error is None or "missing" in error.lower() or error == "Critical fields missing - manual review required"
 
-    def test_process_image_ead(self, processor, test_images_dir):
+    def test_process_image_ead(self, process_image_cached, synthetic_image):
         text = """
         EMPLOYMENT AUTHORIZATION DOCUMENT\nCARD#: ABC1234567890\nNAME: MARIA GARCIA\nDATE OF BIRTH: 05/10/1992\nCATEGORY: C09
         """
-        img_path = self.create_synthetic_image(text, f"{test_images_dir}/ead_test.png")
-        with open(img_path, 'rb') as f:
-            img_bytes = f.read()
-        doc_type, fields, error = processor.process_image(img_bytes)
+        img_bytes = synthetic_image(text)
+        doc_type, fields, error = process_image_cached(img_bytes)
         assert doc_type == "ead_card"
-        field_map = {f["field_name"]: f["field_value"] for f in fields}
+        field_map = as_map(fields)
         assert field_map["card_number"] == "ABC1234567890"
         assert field_map["first_name"] == "MARIA"
         assert field_map["last_name"] == "GARCIA"
         assert error is None or "missing" in error.lower() or error == "Critical fields missing - manual review required"
 
-    def test_normalize_date(self, processor):
+    @pytest.mark.parametrize("raw,expected", [
+        ("15JAN1985", "15 Jan 1985"),
+        ("01FEB2020", "01 Feb 2020"),
+        ("2024-01-15", "2024-01-15"),
+        ("13/13/2024", "13/13/2024"),
+    ])
+    def test_normalize_date(self, processor, raw, expected):
         # Test the public static method
-        assert processor.normalize_date("15JAN1985") == "15 Jan 1985"
-        assert processor.normalize_date("01FEB2020") == "01 Feb 2020"
-        assert processor.normalize_date("2024-01-15") == "2024-01-15"
-        assert processor.normalize_date("13/13/2024") == "13/13/2024"
+        assert processor.normalize_date(raw) == expected
 
     def test_process_image_invalid(self, processor):
         # Test error handling for invalid image data
@@ -116,7 +112,7 @@ class TestDocumentProcessor:
         assert fields == []
         assert error is not None
 
-    def test_low_quality_image_handling(self, processor, test_images_dir):
+    def test_low_quality_image_handling(self, processor):
         """Test with a blurry/low-resolution image to ensure quality checks trigger"""
         # Create a very small, low-quality image
         low_res_image = Image.new('RGB', (50, 30), color='white')
@@ -124,13 +120,10 @@ class TestDocumentProcessor:
         # Add some text that would be unreadable at this resolution
         # In a real test, we would add proper text
         
-        # Save with low quality
-        low_res_path = os.path.join(test_images_dir, "low_res_image.jpg")
-        low_res_image.save(low_res_path, quality=10)
-        
-        # Read the image
-        with open(low_res_path, 'rb') as f:
-            low_res_data = f.read()
+        # Encode with low quality in memory; only the bytes are needed
+        buf = io.BytesIO()
+        low_res_image.save(buf, format="JPEG", quality=10)
+        low_res_data = buf.getvalue()
             
         # Process the low quality image
         doc_type, fields, error_msg = processor.process_image(low_res_data)
@@ -1,84 +1,87 @@
 import pytest
-import os
 import io
 from PIL import Image
 import json
-from app.services.document_processor import DocumentProcessor
+from operator import itemgetter
 from app.utils.field_mapping import standardize_field_names, validate_required_fields, REQUIRED_FIELDS
 from datetime import datetime
 
+_NAME_CASES = [
+    {
+        "full_name": "John Smith",
+        "expected": {"first_name": "John", "last_name": "Smith"}
+    },
+    {
+        "full_name": "Mary Anne Johnson",
+        "expected": {"first_name": "Mary", "last_name": "Anne Johnson"}
+    },
+    {
+        "full_name": "McMillan James",  # Last name first
+        "expected": {"first_name": "James", "last_name": "McMillan"}
+    },
+    {
+        "full_name": "GARCIA-LOPEZ MARIA",  # Hyphenated last name, last name first
+        "expected": {"first_name": "MARIA", "last_name": "GARCIA-LOPEZ"}
+    }
+]
+
+_DATE_CASES = [
+    # US format (MM/DD/YYYY)
+    {"raw": "01/15/2024", "expected": "15 Jan 2024"},
+    # European format (DD/MM/YYYY)
+    {"raw": "15/01/2024", "expected": "15 Jan 2024"},
+    # With different separators
+    {"raw": "01-15-2024", "expected": "15 Jan 2024"},
+    {"raw": "15-01-2024", "expected": "15 Jan 2024"},
+    # Special passport format
+    {"raw": "15JAN2024", "expected": "15 Jan 2024"},
+    {"raw": "01FEB2023", "expected": "01 Feb 2023"},
+    # Date with text month
+    {"raw": "15 January 2024", "expected": "15 January 2024"},
+    # Two-digit year (should preserve original format)
+    {"raw": "15/01/24", "expected": "15/01/24"}
+]
+
+# Fields each mocked GPT response must map to, fetched in one itemgetter call per document type
+_EXPECTED_MAPPED_FIELDS = {
+    "passport": (
+        itemgetter("document_number", "full_name", "date_of_birth", "expiration_date"),
+        ("123456789", "JOHN SMITH", "15JAN1985", "01JAN2030")
+    ),
+    "drivers_license": (
+        itemgetter("license_number", "first_name", "last_name", "date_of_birth", "expiration_date"),
+        ("D1234567", "JOHN", "SMITH", "05/15/1990", "05/15/2025")
+    ),
+    "ead_card": (
+        itemgetter("card_number", "first_name", "last_name", "category", "card_expires_date"),
+        ("EAD1234567890", "MARIA", "GARCIA", "C09", "01/01/2025")
+    )
+}
+
 class TestFuzzyDataHandling:
-    @pytest.fixture
-    def processor(self):
-        return DocumentProcessor()
-    
-    @pytest.fixture
-    def test_dir(self):
-        """Create a test directory if it doesn't exist"""
-        base_dir = "test_data/fuzzy_data"
-        os.makedirs(base_dir, exist_ok=True)
-        return base_dir
-    
-    def test_combined_name_fields(self, processor):
+    @pytest.mark.parametrize("case", _NAME_CASES, ids=lambda c: c["full_name"])
+    def test_combined_name_fields(self, case):
         """Test handling of combined name fields (first+last name together)"""
-        # Test various name combinations
-        test_cases = [
-            {
-                "full_name": "John Smith",
-                "expected": {"first_name": "John", "last_name": "Smith"}
-            },
-            {
-                "full_name": "Mary Anne Johnson",
-                "expected": {"first_name": "Mary", "last_name": "Anne Johnson"}
-            },
-            {
-                "full_name": "McMillan James",  # Last name first
-                "expected": {"first_name": "James", "last_name": "McMillan"}
-            },
-            {
-                "full_name": "GARCIA-LOPEZ MARIA",  # Hyphenated last name, last name first
-                "expected": {"first_name": "MARIA", "last_name": "GARCIA-LOPEZ"}
-            }
-        ]
+        # Create data with only full_name
+        data = {"full_name": case["full_name"], "document_type": "passport"}
         
-        for case in test_cases:
-            # Create data with only full_name
-            data = {"full_name": case["full_name"], "document_type": "passport"}
-            
-            # Standardize the fields
-            standardized = standardize_field_names(data, "passport")
-            
-            # Check if first_name and last_name were properly extracted
-            assert "first_name" in standardized, f"Failed to extract first_name from {case['full_name']}"
-            assert "last_name" in standardized, f"Failed to extract last_name from {case['full_name']}"
+        # Standardize the fields
+        standardized = standardize_field_names(data, "passport")
+        
+        # Check if first_name and last_name were properly extracted
+        assert "first_name" in standardized, f"Failed to extract first_name from {case['full_name']}"
+        assert "last_name" in standardized, f"Failed to extract last_name from {case['full_name']}"
     
-    def test_date_format_standardization(self, processor):
+    @pytest.mark.parametrize("case", _DATE_CASES, ids=lambda c: c["raw"])
+    def test_date_format_standardization(self, processor, case):
         """Test standardization of different date formats"""
-        test_cases = [
-            # US format (MM/DD/YYYY)
-            {"raw": "01/15/2024", "expected": "15 Jan 2024"},
-            # European format (DD/MM/YYYY)
-            {"raw": "15/01/2024", "expected": "15 Jan 2024"},
-            # With different separators
-            {"raw": "01-15-2024", "expected": "15 Jan 2024"},
-            {"raw": "15-01-2024", "expected": "15 Jan 2024"},
-            # Special passport format
-            {"raw": "15JAN2024", "expected": "15 Jan 2024"},
-            {"raw": "01FEB2023", "expected": "01 Feb 2023"},
-            # Date with text month
-            {"raw": "15 January 2024", "expected": "15 January 2024"},
-            # Two-digit year (should preserve original format)
-            {"raw": "15/01/24", "expected": "15/01/24"}
-        ]
-        
-        for case in test_cases:
-            result = processor.normalize_date(case["raw"])
-            # Allow for flexibility in exact format as long as the date components are correct
-            if case["raw"] == "15JAN2024":
-                assert "15" in result and "Jan" in result and "2024" in result, f"Failed to normalize {case['raw']}"
-            else:
-                # This is a less strict check - just ensuring the original date is preserved if not in special format
-                assert result is not None, f"Date normalization failed for {case['raw']}"
+        result = processor.normalize_date(case["raw"])
+        # Allow for flexibility in exact format as long as the date components are correct
+        if case["raw"] == "15JAN2024":
+            assert "15" in result and "Jan" in result and "2024" in result, f"Failed to normalize {case['raw']}"
+        else:
+            # This is a less strict check - just ensuring the original date is preserved if not in special format
+            assert result is not None, f"Date normalization failed for {case['raw']}"
     
     def test_handling_field_variations(self):
         """Test handling of field name variations"""
@@ -223,23 +226,8 @@ class TestFuzzyDataHandling:
             is_valid, missing = validate_required_fields(standardized, doc_type)
             
             # Check if the standardization process correctly mapped the fields
-            if doc_type == "passport":
-                assert standardized["document_number"] == "123456789"
-                assert standardized["full_name"] == "JOHN SMITH"
-                assert standardized["date_of_birth"] == "15JAN1985"
-                assert standardized["expiration_date"] == "01JAN2030"
-            elif doc_type == "drivers_license":
-                assert standardized["license_number"] == "D1234567"
-                assert standardized["first_name"] == "JOHN"
-                assert standardized["last_name"] == "SMITH"
-                assert standardized["date_of_birth"] == "05/15/1990"
-                assert standardized["expiration_date"] == "05/15/2025"
-            elif doc_type == "ead_card":
-                assert standardized["card_number"] == "EAD1234567890"
-                assert standardized["first_name"] == "MARIA"
-                assert standardized["last_name"] == "GARCIA"
-                assert standardized["category"] == "C09"
-                assert standardized["card_expires_date"] == "01/01/2025"
+            get_fields, expected = _EXPECTED_MAPPED_FIELDS[doc_type]
+            assert get_fields(standardized) == expected
 
             # Check if validation works correctly
             assert is_valid, f"Validation failed for {doc_type} with standardized fields"
@@ -0,0 +1,41 @@
+import pytest
+from app.utils.ai import _JsonObjectScanner, _extract_json_object
+
+
+_JSON_OBJECT_CASES = [
+    ('{"a": 1}', '{"a": 1}'),
+    ('Sure, here it is:\n{"a": 1}\nLet me know!', '{"a": 1}'),
+    ('```json\n{"a": 1}\n```', '{"a": 1}'),
+    ('{"a": {"b": {"c": 1}}}', '{"a": {"b": {"c": 1}}}'),
+    ('{"a": "} and {"}', '{"a": "} and {"}'),                    # Braces inside a string
+    ('{"a": "say \\"}\\" twice"}', '{"a": "say \\"}\\" twice"}'),  # Escaped quotes around a brace
+    ('{"a": "C:\\\\"} tail}', '{"a": "C:\\\\"}'),                # Escaped backslash ends the string
+    ('{"a": 1} {"b": 2}', '{"a": 1}'),                          # Stops at the first object
+    ('no json here', None),
+    ('', None),
+    ('{"a": 1', None),                                          # Unbalanced with no closing brace
+    ('} {"a": 1', None),                                        # Only closing brace precedes the object
+    ('{"a": {"b": 1}', '{"a": {"b": 1}'),                       # Unbalanced: up to the last closing brace
+]
+
+
+@pytest.mark.parametrize("text,expected", _JSON_OBJECT_CASES)
+def test_extract_json_object(text, expected):
+    """The first balanced top-level object is returned, ignoring braces inside strings"""
+    assert _extract_json_object(text) == expected
+
+
+@pytest.mark.parametrize("text,expected", [case for case in _JSON_OBJECT_CASES if case[0]])
+def test_scanner_fed_one_character_at_a_time(text, expected):
+    """Feeding the scanner chunk by chunk finds the same object end as feeding it whole"""
+    whole = _JsonObjectScanner()
+    whole.feed(text)
+
+    chunked = _JsonObjectScanner()
+    for ch in text:
+        if chunked.feed(ch):
+            break
+
+    assert (chunked.start, chunked.end) == (whole.start, whole.end)
+    if whole.end != -1:
+        assert text[chunked.start:chunked.end + 1] == expected
@@ -0,0 +1,24 @@
+import pytest
+from app.utils.ai import check_image_quality
+
+
+@pytest.mark.parametrize("width,height,valid", [
+    (400, 200, False),  # Below min in both dimensions
+    (450, 350, False),  # Below min width, acceptable height
+    (550, 250, False),  # Acceptable width, below min height
+    (500, 300, True),   # Exactly minimum requirement
+    (800, 600, True),   # High resolution
+    (660, 426, True),   # Resolution that was previously being rejected
+])
+def test_resolution_validation(make_test_image, width, height, valid):
+    """Images below the 500x300 minimum are rejected; anything at or above it passes"""
+    img = make_test_image(width, height)
+    assert img.size == (width, height)
+
+    is_valid, error_msg = check_image_quality(img)
+
+    assert is_valid == valid
+    if valid:
+        assert error_msg is None
+    else:
+        assert f"Image resolution too low ({width}x{height})" in error_msg
@@ -0,0 +1,7 @@
+"""Shared helpers for the backend test suite"""
+from typing import Dict, List
+
+
+def as_map(fields: List[Dict]) -> Dict[str, str]:
+    """Index the field list returned by DocumentProcessor.process_image by field name"""
+    return {f["field_name"]: f["field_value"] for f in fields}